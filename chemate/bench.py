@@ -0,0 +1,131 @@
+"""
+Search benchmark: DecisionTree.best_move on fixed positions, results saved as JSON and compared with a baseline.
+
+    python -m chemate.bench                               depth 4, results printed
+    python -m chemate.bench -o bench.json                 results saved for later comparison
+    python -m chemate.bench -b bench.json --threshold 0.1 fails when nodes per second drop more than 10%
+    python -m chemate.bench --nodes 20000 --profile       node limited search with hot spots of the profile
+"""
+import argparse
+import cProfile
+import json
+import pstats
+import sys
+import time
+from typing import Union
+
+from chemate.board import Board
+from chemate.decision import DecisionTree
+from chemate.positions import PredefinedFENPosition
+
+POSITIONS = {
+    'opening': 'r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3',
+    'kiwipete': 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'middlegame': 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    'tactics': 'r1b1k2r/ppppnppp/2n2q2/2b5/3NP3/2P1B3/PP3PPP/RN1QKB1R w KQkq - 0 1',
+    'endgame': '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+}
+
+
+def bench_position(fen: str, depth: int, node_limit: Union[int, None]) -> dict:
+    board = Board()
+    board.init(PredefinedFENPosition(fen))
+    decision = DecisionTree(depth)
+    started = time.perf_counter()
+    if node_limit is None:
+        move, score, variants = decision.best_move(board, depth=depth)
+    else:
+        move, score, variants = decision.best_move(board, depth=depth, node_limit=node_limit)
+    elapsed = time.perf_counter() - started
+    return {'move': str(move), 'score': score, 'depth': decision.depth_reached, 'nodes': variants,
+            'time': elapsed, 'nps': variants / elapsed if elapsed else 0}
+
+
+def run(positions: dict, depth: int, node_limit: int = None) -> dict:
+    """
+    Search every position with a new DecisionTree
+    :return: settings, results by position name and totals
+    """
+    results = {name: bench_position(fen, depth, node_limit) for name, fen in positions.items()}
+    nodes = sum(result['nodes'] for result in results.values())
+    elapsed = sum(result['time'] for result in results.values())
+    return {'depth': depth, 'node_limit': node_limit, 'positions': results,
+            'total': {'nodes': nodes, 'time': elapsed, 'nps': nodes / elapsed if elapsed else 0}}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Differences from the baseline: nodes per second below the baseline by more than the threshold fraction
+    are failures, changed moves and node counts are notes
+    :return: failure messages
+    """
+    failures = []
+    nodes = elapsed = base_nodes = base_elapsed = 0
+    for name, result in results['positions'].items():
+        base = baseline['positions'].get(name)
+        if base is None:
+            continue
+        nodes, elapsed = nodes + result['nodes'], elapsed + result['time']
+        base_nodes, base_elapsed = base_nodes + base['nodes'], base_elapsed + base['time']
+        if (result['move'], result['nodes']) != (base['move'], base['nodes']):
+            print(f'{name}: search changed, move {base["move"]} -> {result["move"]}, '
+                  f'nodes {base["nodes"]} -> {result["nodes"]}')
+        if base['nps'] and result['nps'] < base['nps'] * (1 - threshold):
+            failures.append(f'{name}: {result["nps"]:.0f} nps, baseline {base["nps"]:.0f}')
+    # Totals of the positions searched in both runs
+    if elapsed and base_elapsed and nodes / elapsed < base_nodes / base_elapsed * (1 - threshold):
+        failures.append(f'total: {nodes / elapsed:.0f} nps, baseline {base_nodes / base_elapsed:.0f}')
+    return failures
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m chemate.bench', description=__doc__.split('\n')[1])
+    parser.add_argument('positions', nargs='*', help=f'positions to search: {", ".join(POSITIONS)}, all by default')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-n', '--nodes', type=int, help='node limit of every search, deepening up to depth')
+    parser.add_argument('-o', '--output', help='JSON file for the results')
+    parser.add_argument('-b', '--baseline', help='JSON results file to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed drop of nodes per second from the baseline, fraction')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='profile the searches and print hot spots, the profile is saved to FILE if given')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.positions if name not in POSITIONS]
+    if unknown:
+        parser.error(f'unknown positions: {", ".join(unknown)}')
+
+    positions = {name: POSITIONS[name] for name in args.positions or POSITIONS}
+    profile = cProfile.Profile() if args.profile is not None else None
+    if profile is not None:
+        profile.enable()
+    results = run(positions, args.depth, args.nodes)
+    if profile is not None:
+        profile.disable()
+
+    for name, result in results['positions'].items():
+        print(f'{name}: {result["move"]} score {result["score"]:.2f} depth {result["depth"]} '
+              f'nodes {result["nodes"]} time {result["time"]:.2f}s nps {result["nps"]:.0f}')
+    total = results['total']
+    print(f'total: nodes {total["nodes"]} time {total["time"]:.2f}s nps {total["nps"]:.0f}')
+
+    if profile is not None:
+        stats = pstats.Stats(profile, stream=sys.stdout)
+        stats.sort_stats('tottime').print_stats(20)
+        if args.profile:
+            stats.dump_stats(args.profile)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            failures = compare(results, json.load(fp), args.threshold)
+        for failure in failures:
+            print(f'REGRESSION {failure}')
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
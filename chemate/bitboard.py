@@ -0,0 +1,227 @@
+from typing import Iterator, Union
+
+from chemate.board import Board, KingSafety
+from chemate.core import Position, MoveCode, Figure, Player
+from chemate.figures import King, Pawn, Queen, Rook, Bishop, Knight
+from chemate.tables import POSITIONS, KNIGHT_MASKS, KING_MASKS, PAWN_ATTACK_MASKS, \
+    ROOK_RAY_MASKS, BISHOP_RAY_MASKS
+
+
+def slider_attacks(index: int, occupied: int, rays) -> int:
+    """
+    Squares attacked from index along the rays, each ray is cut after the first occupied square
+    """
+    attacks = 0
+    for positive, masks in rays:
+        ray = masks[index]
+        blockers = ray & occupied
+        if blockers:
+            first = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+            ray ^= masks[first]
+        attacks |= ray
+    return attacks
+
+
+def bit_indexes(bits: int) -> Iterator[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+    pass
+
+
+class BitBoard(Board):
+    """
+    Board backed by one 64-bit integer per figure kind and color plus occupancy masks.
+    Figure objects are still kept in the square list, so the public API is the same as Board
+    """
+    kinds = (Pawn, Knight, Bishop, Rook, Queen, King)
+
+    def __init__(self) -> None:
+        self.bits = {}
+        self.occupied = {}
+        super().__init__()
+
+    def clear(self) -> None:
+        super().clear()
+        self.bits = {color: {kind: 0 for kind in self.kinds} for color in (Player.WHITE, Player.BLACK)}
+        self.occupied = {Player.WHITE: 0, Player.BLACK: 0}
+
+    def _set_bit(self, figure: Figure, index: int) -> None:
+        bit = 1 << index
+        self.bits[figure.color][figure.__class__] |= bit
+        self.occupied[figure.color] |= bit
+
+    def _clear_bit(self, figure: Figure, index: int) -> None:
+        bit = ~(1 << index)
+        self.bits[figure.color][figure.__class__] &= bit
+        self.occupied[figure.color] &= bit
+
+    def put_figure(self, figure: Figure) -> None:
+        super().put_figure(figure)
+        self._set_bit(figure, figure.position.index)
+
+    def remove_figure(self, figure: Figure) -> None:
+        super().remove_figure(figure)
+        self._clear_bit(figure, figure.position.index)
+
+    def attacks_from(self, figure: Figure) -> int:
+        """
+        Mask of squares attacked by figure, own figures included
+        """
+        index = figure.position.index
+        kind = figure.__class__
+        if kind is Pawn:
+            return PAWN_ATTACK_MASKS[figure.color][index]
+        if kind is Knight:
+            return KNIGHT_MASKS[index]
+        if kind is King:
+            return KING_MASKS[index]
+        occupied = self.occupied[Player.WHITE] | self.occupied[Player.BLACK]
+        if kind is Rook:
+            return slider_attacks(index, occupied, ROOK_RAY_MASKS)
+        if kind is Bishop:
+            return slider_attacks(index, occupied, BISHOP_RAY_MASKS)
+        return slider_attacks(index, occupied, ROOK_RAY_MASKS) | slider_attacks(index, occupied, BISHOP_RAY_MASKS)
+
+    def attacked_by(self, figure: Figure) -> Iterator[Position]:
+        targets = self.attacks_from(figure) & ~self.occupied[figure.color]
+        for index in bit_indexes(targets):
+            yield POSITIONS[index]
+        pass
+
+    def is_attacked(self, color: int, position: Position) -> bool:
+        index = position.index
+        enemy = self.bits[-color]
+        if KNIGHT_MASKS[index] & enemy[Knight] or KING_MASKS[index] & enemy[King] \
+                or PAWN_ATTACK_MASKS[color][index] & enemy[Pawn]:
+            return True
+        occupied = self.occupied[Player.WHITE] | self.occupied[Player.BLACK]
+        if slider_attacks(index, occupied, ROOK_RAY_MASKS) & (enemy[Rook] | enemy[Queen]):
+            return True
+        return bool(slider_attacks(index, occupied, BISHOP_RAY_MASKS) & (enemy[Bishop] | enemy[Queen]))
+
+    def test_for_check(self, color: int) -> bool:
+        kings = self.bits[color][King]
+        if not kings:
+            return False
+        return self.is_attacked(color, POSITIONS[(kings & -kings).bit_length() - 1])
+
+    @property
+    def figures(self) -> Iterator[Figure]:
+        for index in bit_indexes(self.occupied[Player.WHITE] | self.occupied[Player.BLACK]):
+            yield self.board[index]
+        pass
+
+    def legal_moves(self, color: int, codes: list = None, captures: bool = None,
+                    safety: KingSafety = None) -> list[int]:
+        if codes is None:
+            codes = []
+        else:
+            codes.clear()
+        if safety is None:
+            safety = self.king_safety(color)
+        for index in bit_indexes(self.occupied[color]):
+            self.figure_codes(self.board[index], safety, codes, captures)
+        return codes
+
+    def king_can_step(self, king: Figure, pos: Position, taken_figure: Union[Figure, None]) -> bool:
+        self._clear_bit(king, king.position.index)
+        try:
+            return not self.is_attacked(king.color, pos)
+        finally:
+            self._set_bit(king, king.position.index)
+
+    def passthrough_target(self, figure: Figure) -> Union[Position, None]:
+        """
+        Square where the pawn can take on passthrough after the last move, if any
+        """
+        passthrough = self.passthrough_square()
+        if passthrough is None or passthrough.index // 8 != (5 if figure.color == Player.WHITE else 2):
+            return None
+        if not PAWN_ATTACK_MASKS[figure.color][figure.position.index] & (1 << passthrough.index):
+            return None
+        if not self.bits[-figure.color][Pawn] & (1 << (passthrough.index - 8 * figure.color)):
+            return None
+        return POSITIONS[passthrough.index]
+
+    def figure_codes(self, figure: Figure, safety: KingSafety, codes: list, captures: bool = None) -> None:
+        color = figure.color
+        index = figure.position.index
+        own = self.occupied[color]
+        enemy = self.occupied[-color]
+        occupied = own | enemy
+        rooking = []
+
+        if isinstance(figure, Pawn):
+            targets = PAWN_ATTACK_MASKS[color][index] & enemy if captures is not False else 0
+            step = 8 * color
+            if 0 <= index + step < 64 and not occupied & (1 << (index + step)):
+                # Pushes to the last line are promotions, which go with captures
+                if captures is None or captures == (index + step >= 56 or index + step < 8):
+                    targets |= 1 << (index + step)
+                if captures is not True and figure.position.y == (1 if color == Player.WHITE else 6) \
+                        and not occupied & (1 << (index + 2 * step)):
+                    targets |= 1 << (index + 2 * step)
+            passthrough = self.passthrough_target(figure) if captures is not False else None
+            if passthrough is not None:
+                self._add_codes(figure, index | passthrough.index << 6 | MoveCode.CAPTURE | MoveCode.PASSTHROUGH,
+                                safety, codes)
+        else:
+            targets = self.attacks_from(figure) & ~own
+            if captures is not None:
+                targets &= enemy if captures else ~enemy
+            if captures is not True and isinstance(figure, King) and figure.moves == 0 and figure.initial_pos():
+                for delta in (2, -2):
+                    if not occupied & (1 << (index + delta // 2) | 1 << (index + delta)):
+                        rooking.append(POSITIONS[index + delta])
+
+        for target in bit_indexes(targets):
+            code = index | target << 6
+            if enemy & (1 << target):
+                code |= MoveCode.CAPTURE
+            self._add_codes(figure, code, safety, codes)
+
+        for pos in rooking:
+            rook_valid, rook = self.validate_rooking(figure, pos)
+            if rook_valid:
+                self._add_codes(figure, index | pos.index << 6 | MoveCode.ROOKING, safety, codes)
+        pass
+
+    def _add_codes(self, figure: Figure, code: int, safety: KingSafety, codes: list) -> None:
+        to_index = code >> 6 & 63
+        if isinstance(figure, Pawn) and (to_index >= 56 or to_index < 8):
+            for promotion in range(1, 5):
+                if not self.is_legal(code | promotion << 12, figure, safety):
+                    break
+                codes.append(code | promotion << 12)
+        elif self.is_legal(code, figure, safety):
+            codes.append(code)
+        pass
+
+    def make(self, code: int, transform_to: Figure = None, figure: Figure = None) -> None:
+        from_index = code & 63
+        if figure is None:
+            figure = self.board[from_index]
+        super().make(code, transform_to, figure)
+        to_index = code >> 6 & 63
+        self._clear_bit(figure, from_index)
+        self._set_bit(self.board[to_index], to_index)
+        if code & MoveCode.ROOKING:
+            rook = self.board[to_index - 1 if to_index > from_index else to_index + 1]
+            self._clear_bit(rook, from_index + 3 if to_index > from_index else from_index - 4)
+            self._set_bit(rook, rook.position.index)
+        pass
+
+    def unmake(self) -> None:
+        code, figure = self.history[-1][7:9]
+        from_index = code & 63
+        to_index = code >> 6 & 63
+        self._clear_bit(self.board[to_index], to_index)
+        super().unmake()
+        self._set_bit(figure, from_index)
+        if code & MoveCode.ROOKING:
+            rook = self.board[from_index + 3 if to_index > from_index else from_index - 4]
+            self._clear_bit(rook, to_index - 1 if to_index > from_index else to_index + 1)
+            self._set_bit(rook, rook.position.index)
+        pass
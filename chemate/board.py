@@ -1,25 +1,86 @@
 from typing import Iterator, Union, Type
 
-from chemate.figures import King, Pawn, Queen, Rook, Bishop, Knight
+from chemate.figures import King, Pawn, Queen, Rook, Bishop, Knight, PROMOTION_KINDS
 from chemate.positions import PositionFactory
-from chemate.core import Position, Movement, Figure, Player
-from chemate.directions import Left, Right
+from chemate.core import Position, Movement, MoveCode, Figure, Player
+from chemate.evaluation import square_scores, PHASE_WEIGHTS, WHITE_CASTLED, BLACK_CASTLED
+from chemate.tables import POSITIONS, RAYS, LEFT, RIGHT, QUEEN_RAYS, KNIGHT_HOPS, PAWN_ATTACKS
 from chemate.utils import BoardExporter
+from chemate.zobrist import figure_key, SIDE_KEY, ROOKING_KEYS, PASSTHROUGH_KEYS, \
+    WHITE_SHORT, WHITE_LONG, BLACK_SHORT, BLACK_LONG
+
+# Rooking rights kept after a move from or to the square
+ROOKING_MASKS = tuple(
+    ~{0: WHITE_LONG, 4: WHITE_SHORT | WHITE_LONG, 7: WHITE_SHORT,
+      56: BLACK_LONG, 60: BLACK_SHORT | BLACK_LONG, 63: BLACK_SHORT}.get(index, 0) & 15
+    for index in range(64)
+)
+
+
+class KingSafety(object):
+    """
+    Checkers and pins of one side, computed once per position
+    """
+    __slots__ = ['king', 'checkers', 'evasions', 'pins']
+
+    def __init__(self, king: Union[Figure, None]) -> None:
+        self.king = king
+        self.checkers = []
+        # Squares where a non-king move resolves the check, None when there is no check
+        self.evasions = None
+        # Pinned figure square -> squares it can still move to
+        self.pins = {}
+
+    def add_checker(self, figure: Figure, squares: list) -> None:
+        self.checkers.append(figure)
+        self.evasions = set(squares) if len(self.checkers) == 1 else set()
+
+    def allows(self, figure: Figure, index: int) -> bool:
+        if self.evasions is not None and index not in self.evasions:
+            return False
+        allowed = self.pins.get(figure.position.index)
+        return allowed is None or index in allowed
 
 
 class Board:
     def __init__(self) -> None:
         self.board = []
+        self.pieces = {}
+        self.kings = {}
         self.moves = []
+        self.hash = 0
+        self.rooking = 0
+        self.history = []
+        self.passthrough = None
         self.balance = 0
+        self.opening = 0
+        self.endgame = 0
+        self.phase = 0
+        self.castled = 0
         self.move_number = 1
         self.current = Player.WHITE
         self.clear()
 
     def clear(self) -> None:
         self.board = [None for x in range(64)]
+        # Figures of each color by square index and the king of each color
+        self.pieces = {Player.WHITE: {}, Player.BLACK: {}}
+        self.kings = {Player.WHITE: None, Player.BLACK: None}
         self.moves = []
+        # Zobrist key and rooking rights of the position
+        self.hash = 0
+        self.rooking = 0
+        # State before each move made and what is needed to take the move back
+        self.history = []
+        # Square passed by the pawn moved two squares with the last move
+        self.passthrough = None
         self.balance = 0
+        # Evaluation terms kept with the figures: piece-square scores for opening and endgame,
+        # material phase and WHITE_CASTLED | BLACK_CASTLED bits
+        self.opening = 0
+        self.endgame = 0
+        self.phase = 0
+        self.castled = 0
         self.move_number = 1
 
     def init(self, factory: PositionFactory) -> None:
@@ -36,11 +97,27 @@ class Board:
 
     def put_figure(self, figure: Figure) -> None:
         self.board[figure.position.index] = figure
+        self.pieces[figure.color][figure.position.index] = figure
+        if isinstance(figure, King):
+            self.kings[figure.color] = figure
+        self.hash ^= figure_key(figure, figure.position.index)
         self.balance += figure.price
+        opening, endgame = square_scores(figure, figure.position.index)
+        self.opening += opening
+        self.endgame += endgame
+        self.phase += PHASE_WEIGHTS[figure.char]
 
     def remove_figure(self, figure: Figure) -> None:
         self.board[figure.position.index] = None
+        del self.pieces[figure.color][figure.position.index]
+        if self.kings[figure.color] is figure:
+            self.kings[figure.color] = None
+        self.hash ^= figure_key(figure, figure.position.index)
         self.balance -= figure.price
+        opening, endgame = square_scores(figure, figure.position.index)
+        self.opening -= opening
+        self.endgame -= endgame
+        self.phase -= PHASE_WEIGHTS[figure.char]
 
     def attacked_by(self, figure: Figure) -> Iterator[Position]:
         for direction in figure.directions(True):
@@ -54,9 +131,7 @@ class Board:
         pass
 
     def is_attacked(self, color: int, position: Position) -> bool:
-        for figure in self.board:
-            if figure is None or figure.color == color:
-                continue
+        for figure in self.pieces[-color].values():
             if position in self.attacked_by(figure):
                 return True
         return False
@@ -67,6 +142,55 @@ class Board:
             return self.moves[-1]
         return None
 
+    def passthrough_square(self) -> Union[Position, None]:
+        """
+        Square passed by the pawn moved two squares with the last move, if any
+        """
+        return self.passthrough
+
+    def rooking_rights(self) -> int:
+        """
+        Rooking available by figures placement as WHITE_SHORT | WHITE_LONG | BLACK_SHORT | BLACK_LONG bits.
+        Board.rooking keeps the same value updated by moves
+        """
+        rights = 0
+        for color, king_index, short, long in ((Player.WHITE, 4, WHITE_SHORT, WHITE_LONG),
+                                               (Player.BLACK, 60, BLACK_SHORT, BLACK_LONG)):
+            king = self.board[king_index]
+            if king is None or king.color != color or king.moves > 0 or not isinstance(king, King):
+                continue
+            for rook_index, bit in ((king_index + 3, short), (king_index - 4, long)):
+                rook = self.board[rook_index]
+                if rook is not None and rook.color == color and rook.moves == 0 and isinstance(rook, Rook):
+                    rights |= bit
+        return rights
+
+    def state_key(self) -> int:
+        """
+        Part of the zobrist key that doesn't depend on figure placement
+        """
+        key = ROOKING_KEYS[self.rooking]
+        passthrough = self.passthrough_square()
+        if passthrough is not None:
+            key ^= PASSTHROUGH_KEYS[passthrough.index % 8]
+        if self.current == Player.BLACK:
+            key ^= SIDE_KEY
+        return key
+
+    def compute_hash(self) -> int:
+        """
+        Zobrist key of the current position computed from scratch
+        """
+        key = self.state_key()
+        for figure in self.figures:
+            key ^= figure_key(figure, figure.position.index)
+        return key
+
+    def rehash(self) -> None:
+        self.rooking = self.rooking_rights()
+        self.hash = self.compute_hash()
+        self.history = []
+
     @property
     def figures(self) -> Iterator[Figure]:
         for figure in self.board:
@@ -78,161 +202,377 @@ class Board:
         return self.board[position.index]
 
     def figure_by_class(self, kind, color: int = None) -> Iterator[Figure]:
-        for figure in self.board:
-            if figure is not None and (color is None or figure.color == color) and isinstance(figure, kind):
+        if color is None:
+            yield from self.figure_by_class(kind, Player.WHITE)
+            yield from self.figure_by_class(kind, Player.BLACK)
+            return
+        for figure in tuple(self.pieces[color].values()):
+            if isinstance(figure, kind):
                 yield figure
         pass
 
     def valid_moves(self, color: int) -> Iterator[Movement]:
-        for figure in self.figures:
-            if figure.color == color:
-                yield from self.figure_moves(figure)
-        pass
+        # Movements are built for the current position before the caller makes any of them
+        yield from [self.movement(code) for code in self.legal_moves(color)]
+
+    def legal_moves(self, color: int, codes: list = None, captures: bool = None,
+                    safety: KingSafety = None) -> list[int]:
+        """
+        Legal moves of color as MoveCode ints, the search passes a buffer of the ply to fill.
+        With captures True only captures and promotions are generated, with False only the other moves
+        """
+        if codes is None:
+            codes = []
+        else:
+            codes.clear()
+        if safety is None:
+            safety = self.king_safety(color)
+        # Moves are made and taken back while testing, which reorders the index, so iterate over a copy
+        for figure in tuple(self.pieces[color].values()):
+            self.figure_codes(figure, safety, codes, captures)
+        return codes
+
+    def find_move(self, key: int, safety: KingSafety) -> Union[int, None]:
+        """
+        Legal move code of the side to move with the key (from the table or a killer), None if there is no such move
+        """
+        figure = self.board[key & 63]
+        if figure is None or figure.color != self.current:
+            return None
+        codes = []
+        self.figure_codes(figure, safety, codes)
+        for code in codes:
+            if code & MoveCode.KEY_MASK == key:
+                return code
+        return None
 
-    def figure_moves(self, figure: Figure) -> Iterator[Movement]:
+    def movement(self, code: int, figure: Figure = None) -> Movement:
+        """
+        Movement object for the move code in the current position, for callers outside of the search
+        """
+        from_index = code & 63
+        to_index = code >> 6 & 63
+        if figure is None:
+            figure = self.board[from_index]
+        taken_figure = self.board[to_index - 8 * figure.color if code & MoveCode.PASSTHROUGH else to_index]
+        promotion = code >> 12 & 7
+        rook = None
+        if code & MoveCode.ROOKING:
+            rook = self.board[from_index + 3 if to_index > from_index else from_index - 4]
+        return Movement(
+            figure=figure,
+            from_pos=POSITIONS[from_index],
+            to_pos=POSITIONS[to_index],
+            taken_figure=taken_figure,
+            transform_to=PROMOTION_KINDS[promotion](figure.color, POSITIONS[to_index]) if promotion else None,
+            rook=rook
+        )
+
+    def king_safety(self, color: int) -> KingSafety:
+        """
+        Find figures checking the king of color and own figures pinned to it
+        """
+        king = self.kings[color]
+        safety = KingSafety(king)
+        if king is None:
+            return safety
+        index = king.position.index
+
+        for number, ray in enumerate(QUEEN_RAYS[index]):
+            attackers = (Rook, Queen) if number < 4 else (Bishop, Queen)
+            squares = []
+            pinned = None
+            for pos in ray:
+                squares.append(pos.index)
+                figure = self.board[pos.index]
+                if figure is None:
+                    continue
+                if figure.color == color:
+                    if pinned is not None:
+                        break
+                    pinned = figure
+                    continue
+                if isinstance(figure, attackers):
+                    if pinned is None:
+                        safety.add_checker(figure, squares)
+                    else:
+                        safety.pins[pinned.position.index] = set(squares)
+                break
+
+        for kind, hops in ((Knight, KNIGHT_HOPS[index]), (Pawn, PAWN_ATTACKS[color][index])):
+            for ray in hops:
+                figure = self.board[ray[0].index]
+                if figure is not None and figure.color != color and isinstance(figure, kind):
+                    safety.add_checker(figure, [ray[0].index])
+        return safety
+
+    def is_legal(self, code: int, figure: Figure, safety: KingSafety) -> bool:
+        """
+        Check that the move of the figure doesn't leave own king under attack
+        """
+        if safety.king is None:
+            return True
+        to_index = code >> 6 & 63
+        if figure is safety.king:
+            # Rooking squares are already verified by validate_rooking
+            return bool(code & MoveCode.ROOKING) \
+                or self.king_can_step(figure, POSITIONS[to_index], self.board[to_index])
+        if code & MoveCode.PASSTHROUGH:
+            # Take on passthrough removes two figures from the king's lines, so test it directly
+            self.make(code)
+            has_check = self.test_for_check(figure.color)
+            self.unmake()
+            return not has_check
+        return safety.allows(figure, to_index)
+
+    def king_can_step(self, king: Figure, pos: Position, taken_figure: Union[Figure, None]) -> bool:
+        self.board[king.position.index] = None
+        if taken_figure is not None:
+            self.board[pos.index] = None
+        try:
+            return not self.is_attacked(king.color, pos)
+        finally:
+            self.board[king.position.index] = king
+            if taken_figure is not None:
+                self.board[pos.index] = taken_figure
+
+    def figure_moves(self, figure: Figure, safety: KingSafety = None) -> Iterator[Movement]:
+        if safety is None:
+            safety = self.king_safety(figure.color)
+        codes = []
+        self.figure_codes(figure, safety, codes)
+        yield from [self.movement(code, figure) for code in codes]
+
+    def figure_codes(self, figure: Figure, safety: KingSafety, codes: list, captures: bool = None) -> None:
+        """
+        Append legal moves of the figure as MoveCode ints, captures selects moves as in legal_moves
+        """
+        board = self.board
+        color = figure.color
+        from_index = figure.position.index
         is_pawn = isinstance(figure, Pawn)
         is_king = isinstance(figure, King)
 
         for direction in figure.directions():
             for pos in direction:
-                taken_figure = self.figure_at(pos)
-                rook = None
-                transform_to = [None]
-
-                if taken_figure is not None and taken_figure.color == figure.color:
-                    break
+                to_index = pos.index
+                taken_figure = board[to_index]
+                code = from_index | to_index << 6
 
-                if is_pawn:
-                    if figure.position.x == pos.x and taken_figure is not None:
+                if taken_figure is not None:
+                    if taken_figure.color == color:
                         break
+                    code |= MoveCode.CAPTURE
 
-                    if figure.position.x != pos.x and taken_figure is None:
-                        if not (pos.y == 5 and figure.color == Player.WHITE) and \
-                                not (pos.y == 2 and figure.color == Player.BLACK):
+                if is_pawn:
+                    if from_index % 8 == to_index % 8:
+                        if taken_figure is not None:
                             break
-                        passthrough_pos = Position(pos.index + (-8 if figure.color == Player.WHITE else +8))
-                        taken_figure = self.figure_at(passthrough_pos)
-                        if taken_figure is None or not isinstance(taken_figure, Pawn) or \
-                                taken_figure.color == figure.color:
+                    elif taken_figure is None:
+                        passthrough = self.passthrough
+                        if passthrough is None or passthrough.index != to_index:
                             break
-                        if self.last_move is None or self.last_move.figure != taken_figure or \
-                                abs(self.last_move.from_pos.index - self.last_move.to_pos.index) != 16:
+                        taken_figure = board[to_index - 8 * color]
+                        if taken_figure is None or not isinstance(taken_figure, Pawn) or taken_figure.color == color:
                             break
+                        code |= MoveCode.CAPTURE | MoveCode.PASSTHROUGH
 
-                if is_pawn and pos.is_last_line_for(figure.color):
-                    transform_to = [
-                        Queen(figure.color, pos), Rook(figure.color, pos), Bishop(figure.color, pos),
-                        Knight(figure.color, pos)
-                    ]
+                    if to_index >= 56 or to_index < 8:
+                        if captures is False:
+                            break
+                        for promotion in range(1, 5):
+                            if not self.is_legal(code | promotion << 12, figure, safety):
+                                break
+                            codes.append(code | promotion << 12)
+                        break
 
                 # King rooking logic
-                if is_king and abs(pos.index-figure.position.index) == 2:
+                if is_king and abs(to_index - from_index) == 2:
+                    if captures:
+                        break
                     rook_valid, rook = self.validate_rooking(figure, pos)
                     if not rook_valid:
                         break
+                    code |= MoveCode.ROOKING
 
-                for transform in transform_to:
-                    move = Movement(
-                        figure=figure,
-                        from_pos=figure.position,
-                        to_pos=pos,
-                        taken_figure=taken_figure,
-                        transform_to=transform,
-                        rook=rook
-                    )
-                    self.move(move, test_mode=True)
-                    has_check = self.test_for_check(figure.color)
-                    self.rollback()
-                    if has_check:
-                        break
-                    yield move
+                if (captures is None or captures == bool(code & MoveCode.CAPTURE)) \
+                        and self.is_legal(code, figure, safety):
+                    codes.append(code)
                 if taken_figure is not None:
                     break
         pass
 
     def validate_rooking(self, king: Figure, pos: Position) -> tuple[bool, Union[Figure, None]]:
         is_long = (pos.index - king.position.index) < 0
-        rook = self.figure_at(Position.from_xy(0 if is_long else 7, pos.y))
+        rook = self.board[pos.index - pos.index % 8 + (0 if is_long else 7)]
 
         if rook is None or not isinstance(rook, Rook) or king.color != rook.color or rook.moves > 0:
             return False, rook
 
-        rook_direction = Left(king.position, 3) if is_long else Right(king.position, 2)
+        rook_direction = RAYS[LEFT][king.position.index][:3] if is_long else RAYS[RIGHT][king.position.index][:2]
         for figure in map(self.figure_at, rook_direction):
             if figure is not None:
                 return False, rook
 
         for delta in range(0, -3 if is_long else +3, -1 if is_long else 1):
-            if self.is_attacked(king.color, Position(king.position.index+delta)):
+            if self.is_attacked(king.color, POSITIONS[king.position.index + delta]):
                 return False, rook
         return True, rook
 
     def move(self, movement: Movement, test_mode: bool = False) -> None:
-        if movement.taken_figure is not None:
-            self.remove_figure(movement.taken_figure)
-            self.balance -= movement.taken_figure.price
-
-        self.board[movement.from_pos.index] = None
-        self.board[movement.to_pos.index] = movement.transform_to or movement.figure
-
-        if movement.transform_to is not None:
-            self.balance += movement.transform_to.price
-            self.balance -= movement.figure.price
-
-        movement.figure.position = movement.to_pos
-        movement.figure.moves += 1
-
-        if movement.rook is not None:
-            is_long = movement.to_pos.index - movement.from_pos.index < 0
-            rook_pos = Position(movement.to_pos.index + (1 if is_long else -1))
-            self.board[movement.rook.position.index] = None
-            self.board[rook_pos.index] = movement.rook
-            movement.rook.position = rook_pos
-            movement.rook.moves += 1
-
+        # Movements may come from another process with copies of the figures, the board keeps its own
+        figure = self.board[movement.from_pos.index]
+        self.make(movement.code, movement.transform_to, movement.figure if figure is None else figure)
         self.moves.append(movement)
-
         if not test_mode:
             movement.is_check = self.test_for_check(movement.figure.color * -1)
-        if movement.figure.color == Player.BLACK:
-            self.move_number += 1
-        self.current = -movement.figure.color
         pass
 
     def rollback(self) -> None:
         if len(self.moves) == 0:
             return
+        self.moves.pop()
+        self.unmake()
+        pass
 
-        move = self.moves.pop()
-
-        self.board[move.to_pos.index] = None
-        self.board[move.from_pos.index] = move.figure
-        move.figure.position = move.from_pos
-        move.figure.moves -= 1
-
-        if move.rook is not None:
-            is_long = move.to_pos.index - move.from_pos.index < 0
-            initial_pos = Position(move.to_pos.index + (-2 if is_long else 1))
-            self.board[move.rook.position.index] = None
-            self.board[initial_pos.index] = move.rook
-            move.rook.position = initial_pos
-            move.rook.moves -= 1
+    def make(self, code: int, transform_to: Figure = None, figure: Figure = None) -> None:
+        """
+        Make the move given as MoveCode int. The promoted figure is created here unless given,
+        the moving figure is taken from the board unless given
+        """
+        board = self.board
+        from_index = code & 63
+        to_index = code >> 6 & 63
+        if figure is None:
+            figure = board[from_index]
+        color = figure.color
+        taken_figure = None
+        if code & MoveCode.CAPTURE:
+            taken_figure = board[to_index - 8 * color if code & MoveCode.PASSTHROUGH else to_index]
+
+        self.history.append((self.hash, self.rooking, self.opening, self.endgame, self.phase, self.castled,
+                             self.passthrough, code, figure, taken_figure))
+        self.hash ^= self.state_key()
+        self.rooking &= ROOKING_MASKS[from_index] & ROOKING_MASKS[to_index]
+
+        if taken_figure is not None:
+            self.remove_figure(taken_figure)
+
+        placed = figure
+        promotion = code >> 12 & 7
+        if promotion:
+            placed = transform_to or PROMOTION_KINDS[promotion](color, POSITIONS[to_index])
+            self.balance += placed.price
+            self.balance -= figure.price
+            self.phase += PHASE_WEIGHTS[placed.char]
+
+        self.hash ^= figure_key(figure, from_index) ^ figure_key(placed, to_index)
+        from_opening, from_endgame = square_scores(figure, from_index)
+        to_opening, to_endgame = square_scores(placed, to_index)
+        self.opening += to_opening - from_opening
+        self.endgame += to_endgame - from_endgame
+
+        pieces = self.pieces[color]
+        pieces.pop(from_index, None)
+        pieces[to_index] = placed
+        board[from_index] = None
+        board[to_index] = placed
+        figure.position = POSITIONS[to_index]
+        figure.moves += 1
+
+        if code & MoveCode.ROOKING:
+            rook_from, rook_to = (from_index + 3, to_index - 1) if to_index > from_index \
+                else (from_index - 4, to_index + 1)
+            rook = board[rook_from]
+            self.hash ^= figure_key(rook, rook_from) ^ figure_key(rook, rook_to)
+            from_opening, from_endgame = square_scores(rook, rook_from)
+            to_opening, to_endgame = square_scores(rook, rook_to)
+            self.opening += to_opening - from_opening
+            self.endgame += to_endgame - from_endgame
+            self.castled |= WHITE_CASTLED if color == Player.WHITE else BLACK_CASTLED
+            del pieces[rook_from]
+            pieces[rook_to] = rook
+            board[rook_from] = None
+            board[rook_to] = rook
+            rook.position = POSITIONS[rook_to]
+            rook.moves += 1
+
+        if isinstance(figure, Pawn) and abs(to_index - from_index) == 16:
+            self.passthrough = POSITIONS[(from_index + to_index) // 2]
+        else:
+            self.passthrough = None
+        if color == Player.BLACK:
+            self.move_number += 1
+        self.current = -color
+        self.hash ^= self.state_key()
+        pass
 
-        if move.taken_figure is not None:
-            self.put_figure(move.taken_figure)
-            self.balance += move.taken_figure.price
+    def unmake(self) -> None:
+        """
+        Take back the last move made by make
+        """
+        state = self.history.pop()
+        code, figure, taken_figure = state[7:]
+        board = self.board
+        from_index = code & 63
+        to_index = code >> 6 & 63
+        color = figure.color
+
+        placed = board[to_index]
+        pieces = self.pieces[color]
+        del pieces[to_index]
+        pieces[from_index] = figure
+        board[to_index] = None
+        board[from_index] = figure
+        figure.position = POSITIONS[from_index]
+        figure.moves -= 1
+        if placed is not figure:
+            self.balance -= placed.price
+            self.balance += figure.price
+
+        if code & MoveCode.ROOKING:
+            rook_from, rook_to = (from_index + 3, to_index - 1) if to_index > from_index \
+                else (from_index - 4, to_index + 1)
+            rook = board[rook_to]
+            del pieces[rook_to]
+            pieces[rook_from] = rook
+            board[rook_to] = None
+            board[rook_from] = rook
+            rook.position = POSITIONS[rook_from]
+            rook.moves -= 1
+
+        if taken_figure is not None:
+            self.put_figure(taken_figure)
+
+        if color == Player.BLACK:
+            self.move_number -= 1
+        self.current = color
+        self.hash, self.rooking, self.opening, self.endgame, self.phase, self.castled, self.passthrough = state[:7]
+        pass
 
-        if move.transform_to is not None:
-            self.balance -= move.transform_to.price
-            self.balance += move.figure.price
+    def null_move(self) -> None:
+        """
+        Give the move to the other side without moving any figure, used by null-move pruning
+        """
+        self.history.append((self.hash, self.rooking, self.opening, self.endgame, self.phase, self.castled,
+                             self.passthrough, 0, None, None))
+        self.hash ^= self.state_key()
+        self.passthrough = None
+        self.current = -self.current
+        self.hash ^= self.state_key()
+        pass
 
-        if move.figure.color == Player.BLACK:
-            self.move_number -= 1
-        self.current = move.figure.color
+    def rollback_null_move(self) -> None:
+        self.current = -self.current
+        self.hash, self.rooking, self.opening, self.endgame, self.phase, self.castled, \
+            self.passthrough = self.history.pop()[:7]
         pass
 
+    def after_null_move(self) -> bool:
+        return bool(self.history) and self.history[-1][8] is None
+
     def test_for_check(self, color: int) -> bool:
-        king = next(self.figure_by_class(King, color), None)
+        king = self.kings[color]
         if king is None:
             return False
         return self.is_attacked(king.color, king.position)
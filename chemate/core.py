@@ -1,4 +1,4 @@
-from typing import Iterator
+from typing import Sequence
 
 import chemate.figures
 
@@ -13,12 +13,22 @@ class Player(object):
 
 class Position(object):
     """
-    This class describes figure position at board
+    This class describes figure position at board.
+    All 64 squares are created once and Position(index) returns the same object, so positions
+    are compared by identity
     """
     __slots__ = ['index']
+    _squares = ()
 
-    def __init__(self, index):
-        self.index = index
+    def __new__(cls, index):
+        if 0 <= index < len(cls._squares):
+            return cls._squares[index]
+        position = super().__new__(cls)
+        position.index = index
+        return position
+
+    def __reduce__(self):
+        return Position, (self.index,)
 
     @classmethod
     def from_char(cls, value):
@@ -56,13 +66,13 @@ class Position(object):
         """
         return "%s%d" % (chr(ord('a') + self.x), self.y + 1)
 
-    def __eq__(self, other):
-        return self.index == other.index
+
+Position._squares = tuple(Position(index) for index in range(64))
 
 
 class Direction:
     delta = 0
-    all_positions = [Position(index) for index in range(64)]
+    all_positions = Position._squares
 
     def __init__(self, position: Position, limit: int = 7) -> None:
         self.position = position
@@ -82,6 +92,28 @@ class Direction:
         return self.position
 
 
+class MoveCode(object):
+    """
+    Move packed into an int, used inside the search instead of Movement objects:
+    from square, to square << 6, promotion << 12 and flags. The low bits are Movement.key
+    """
+    KEY_MASK = 0x7fff
+    PROMOTION_MASK = 0x7000
+    # Promotion figures by number, 0 means no promotion
+    PROMOTIONS = '.qrbn'
+    CAPTURE = 1 << 15
+    PASSTHROUGH = 1 << 16
+    ROOKING = 1 << 17
+
+    @staticmethod
+    def name(code: int) -> str:
+        """
+        Move in coordinate notation used by perft tools and traces, like e7e8q
+        """
+        promotion = code >> 12 & 7
+        return f'{Position(code & 63)}{Position(code >> 6 & 63)}{MoveCode.PROMOTIONS[promotion] if promotion else ""}'
+
+
 class Movement(object):
     __slots__ = ["figure",
                  "from_pos",
@@ -118,6 +150,28 @@ class Movement(object):
         pos = data.split('-')
         return cls(from_pos=Position.from_char(pos[0]), to_pos=Position.from_char(pos[1]))
 
+    @property
+    def key(self) -> int:
+        """
+        Compact integer identifying the move within its position
+        """
+        promotion = 0 if self.transform_to is None else MoveCode.PROMOTIONS.index(self.transform_to._char)
+        return self.from_pos.index | self.to_pos.index << 6 | promotion << 12
+
+    @property
+    def code(self) -> int:
+        """
+        The move as MoveCode int
+        """
+        code = self.key
+        if self.taken_figure is not None:
+            code |= MoveCode.CAPTURE
+            if self.taken_figure.position.index != self.to_pos.index:
+                code |= MoveCode.PASSTHROUGH
+        if self.rook is not None:
+            code |= MoveCode.ROOKING
+        return code
+
     def __str__(self):
         if self.rook is not None:
             return '0-0-0' if self.to_pos.index-self.from_pos.index < 0 else '0-0'
@@ -131,6 +185,7 @@ class Movement(object):
 
 
 class Figure:
+    __slots__ = ['color', 'position', 'moves']
     _price = 0
     _char = '.'
     _char_maps = dict(zip("KQRBNPkqrbnp", (chr(uc) for uc in range(0x2654, 0x2660))))
@@ -149,9 +204,9 @@ class Figure:
         return self.__class__(self.color, self.position)
 
     def __eq__(self, other):
-        return self.__class__ == other.__class__ \
+        return self.__class__ is other.__class__ \
                and self.color == other.color \
-               and self.position == other.position
+               and self.position is other.position
 
     @property
     def price(self) -> int:
@@ -172,5 +227,9 @@ class Figure:
     def __str__(self):
         return f'{self.char}{self.position}'
 
-    def directions(self, attack: bool = False) -> Iterator[Direction]:
+    def directions(self, attack: bool = False) -> Sequence[Sequence[Position]]:
+        """
+        Rays available for the figure from its current position
+        :param attack: only rays where the figure attacks
+        """
         pass
@@ -1,89 +1,610 @@
-import functools
-import itertools
-import multiprocessing
 import random
+import time
+from typing import Iterator, Union
 
 from chemate.board import Board
-from chemate.core import Position, Player, Movement
+from chemate.core import Position, Movement, MoveCode
+from chemate.evaluation import WHITE_CASTLED, BLACK_CASTLED, MAX_PHASE
+from chemate.figures import Pawn, King, PROMOTION_KINDS
+from chemate.ordering import MoveOrdering
+from chemate.pool import SearchPool, SearchToken, encode_position
+from chemate.stats import SearchStats, SearchTracer
+from chemate.tables import POSITIONS
+from chemate.transposition import TranspositionTable, Bound
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside the search when the time or node budget is exhausted or the search is cancelled
+    """
+    pass
 
 
 class DecisionTree(object):
+    # Depth limit for searches bounded by time or nodes only
+    max_depth = 64
+    mate_score = 9999
+    infinity = 10000
+    # Width of the null window used to test moves after the first one
+    null_window = 0.01
+    # Initial half width of the root aspiration window
+    aspiration_window = 0.5
+    # Leaves are searched further by captures until the position is quiet
+    quiescence = True
+    # Positions in check at quiescence are searched with all evasions instead of the stand pat
+    quiescence_evasions = False
+    # Captures which can't raise the stand pat to alpha even with this margin are skipped
+    delta_margin = 2
+    # Selective search, each part can be switched off
+    null_move = True
+    late_move_reductions = True
+    futility_pruning = True
+    razoring = True
+    # Null move is searched this much shallower than the other moves
+    null_move_reduction = 2
+    # Quiet moves from this number on are searched one ply shallower, from twice the number two plies
+    late_move_index = 3
+    # Quiet moves at the frontier are skipped when the estimate is this far below alpha
+    futility_margin = 4
+    # Positions this far below alpha per ply of depth are only searched by quiescence
+    razor_margin = 6
+    # Settings passed with the position to pool workers
+    options = ('quiescence', 'quiescence_evasions', 'null_move', 'late_move_reductions', 'futility_pruning',
+               'razoring', 'variety', 'noise_key')
+
     _central = [Position.from_char('d4'),
                 Position.from_char('e4'),
                 Position.from_char('d5'),
                 Position.from_char('e5')]
 
-    """ 
-    This class realize decision tree algorithm
     """
-    def __init__(self, max_level: int) -> None:
+    This class realize decision tree algorithm:
+    negamax alpha-beta search with principal variation search and aspiration windows at the root.
+    With a worker pool root moves are split between workers, or with lazy_smp all workers search
+    the whole position at staggered depths sharing the pool's transposition table
+    """
+    def __init__(self, max_level: int, table_memory: int = 16 * 1024 * 1024, pool: SearchPool = None,
+                 lazy_smp: bool = False, variety: float = 0.0, seed: int = None,
+                 tracer: SearchTracer = None) -> None:
         self.board = None
         self.max_level = max_level
+        # Estimates are deterministic unless variety is set: then every search adds noise of this width,
+        # the same for a position within the search, and the noise of searches repeats for the same seed
+        self.variety = variety
+        self.random = random.Random(seed)
+        self.noise_key = 0
+        # Worker pool owned by the application, root moves are searched in this process without it
+        self.pool = pool
+        self.lazy_smp = lazy_smp
+        self.table = pool.table.view() if pool is not None else TranspositionTable(table_memory)
+        self.ordering = MoveOrdering()
+        # Move code lists reused by every node of the ply
+        self.buffers = []
+        # Nodes visited by the running search, quiescence nodes included
+        self.variants = 0
+        self.quiescence_variants = 0
+        # Positions pruned or reduced by each part of the selective search
+        self.pruning = self.new_pruning_stats()
+        # Beta cutoffs, all and by the first move of the node
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Statistics of the last best_move search
+        self.stats = SearchStats()
+        # Callbacks for every position searched in this process, tracing is off without it
+        self.tracer = tracer
+        # Budget of the running search: absolute time and nodes
+        self.deadline = None
+        self.node_limit = None
+        # Depth of the last completed iteration of best_move
+        self.depth_reached = 0
+        # Cancellation tokens of the running search and of the root moves given to the pool
+        self.token = None
+        self.batch = None
+        # Cancellation token given by the caller of best_move, it may be cancelled before the search starts
+        self.caller_token = None
         pass
 
-    def estimate_move(self, variants: int, color: int, depth: int, alpha: int, beta: int, move: Movement) -> tuple[float, int]:
-        self.board.move(move)
-        score, variants = self.mini_max(variants+1, -color, depth-1, alpha, beta)
-        self.board.rollback()
-        return score, variants
+    def move_buffer(self, ply: int) -> list:
+        while len(self.buffers) <= ply:
+            self.buffers.append([])
+        return self.buffers[ply]
+
+    def search_options(self) -> dict:
+        return {name: getattr(self, name) for name in self.options}
+
+    @staticmethod
+    def new_pruning_stats() -> dict:
+        return {'null_move': 0, 'null_move_cutoffs': 0, 'reductions': 0, 'reduction_researches': 0,
+                'futility': 0, 'razoring': 0}
+
+    def reset_counters(self) -> None:
+        self.variants = 0
+        self.quiescence_variants = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.pruning = self.new_pruning_stats()
+
+    def search_counters(self) -> dict:
+        """
+        Counters of the search, passed from pool workers to the main search
+        """
+        return {'variants': self.variants, 'quiescence_variants': self.quiescence_variants,
+                'cutoffs': self.cutoffs, 'first_move_cutoffs': self.first_move_cutoffs, 'pruning': self.pruning}
+
+    def add_search_counters(self, counters: dict) -> None:
+        self.variants += counters['variants']
+        self.quiescence_variants += counters['quiescence_variants']
+        self.cutoffs += counters['cutoffs']
+        self.first_move_cutoffs += counters['first_move_cutoffs']
+        for name, count in counters['pruning'].items():
+            self.pruning[name] += count
+
+    def cancel(self) -> None:
+        """
+        Stop the running search, best_move returns the result of the last completed iteration
+        """
+        if self.token is not None:
+            self.token.cancel()
+        batch = self.batch
+        if batch is not None:
+            batch.cancel()
+
+    def check_budget(self) -> None:
+        if (self.token is not None and self.token.cancelled) \
+                or (self.caller_token is not None and self.caller_token.cancelled) \
+                or (self.deadline is not None and time.time() > self.deadline) \
+                or (self.node_limit is not None and self.variants > self.node_limit):
+            raise SearchAborted()
+
+    def search_root_move(self, depth: int, alpha: float, beta: float,
+                         move: int) -> tuple[Union[float, None], dict, dict]:
+        """
+        Estimate one root move in a worker process
+        :return: score or None when the budget is exhausted, search counters and statistics of the worker's table
+        """
+        self.table.reset_stats()
+        try:
+            score = self.search_move(move, depth, alpha, beta, 0)
+        except SearchAborted:
+            score = None
+        return score, self.search_counters(), self.table.stats()
 
-    def best_move(self, board: Board, depth: int = None) -> tuple[Movement, float, int]:
+    def search_move(self, move: int, depth: int, alpha: float, beta: float, ply: int) -> float:
+        """
+        Make the move given as MoveCode int and search the position after it
+        :return: score for the side which made the move
+        """
+        self.board.make(move)
+        score = None
+        if self.tracer is not None:
+            self.tracer.enter(ply + 1, move, depth - 1, -beta, -alpha)
+        try:
+            score = self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            return -score
+        finally:
+            if self.tracer is not None:
+                self.tracer.leave(ply + 1, score)
+            self.board.unmake()
+
+    def test_root_moves(self, depth: int, moves: list[int],
+                        alpha: float) -> Iterator[Union[float, None]]:
+        """
+        Null window scores of root moves computed by pool workers, all moves are tested against the same alpha
+        """
+        # Workers watch a token of their own, so moves left over after a cutoff are dropped too
+        self.batch = self.pool.acquire()
+        try:
+            if self.token.cancelled:
+                self.batch.cancel()
+            node_limit = None if self.node_limit is None else self.node_limit - self.variants
+            results = self.pool.search_moves(self.batch, encode_position(self.board), self.search_options(), moves,
+                                             depth, alpha, alpha + self.null_window, self.deadline, node_limit)
+            for score, counters, table_stats in results:
+                self.add_search_counters(counters)
+                self.table.add_stats(table_stats)
+                yield score
+        finally:
+            self.batch.cancel()
+            self.pool.release(self.batch)
+            self.batch = None
+        pass
+
+    def search_root(self, depth: int, moves: list[int],
+                    alpha: float, beta: float) -> list[tuple[int, float]]:
+        """
+        Estimate root moves at the depth. The first move is searched with the full window,
+        the others are tested with a null window above its score (by pool workers when there is a pool)
+        and re-searched on fail high
+        :return: moves with scores, scores outside of the window are bounds only
+        """
+        scores = [(moves[0], self.search_move(moves[0], depth, alpha, beta, 0))]
+        alpha = max(alpha, scores[0][1])
+        if alpha >= beta or len(moves) == 1:
+            return scores + [(move, -self.infinity) for move in moves[1:]]
+
+        # In this process moves are tested against the current alpha, pool workers test against alpha at the start
+        tested = alpha
+        results = self.test_root_moves(depth, moves[1:], alpha) if self.pool is not None and not self.lazy_smp \
+            else None
+        try:
+            for index in range(1, len(moves)):
+                if results is None:
+                    tested = alpha
+                    score = self.search_move(moves[index], depth, alpha, alpha + self.null_window, 0)
+                else:
+                    score = next(results)
+                if score is None:
+                    raise SearchAborted()
+                self.check_budget()
+                if tested < score <= alpha:
+                    # Failed high against an older alpha: only a lower bound, test again against the current one
+                    score = self.search_move(moves[index], depth, alpha, alpha + self.null_window, 0)
+                if score > alpha:
+                    score = self.search_move(moves[index], depth, alpha, beta, 0)
+                    alpha = max(alpha, score)
+                scores.append((moves[index], score))
+                if alpha >= beta:
+                    return scores + [(move, -self.infinity) for move in moves[index + 1:]]
+        finally:
+            if results is not None:
+                results.close()
+        return scores
+
+    def best_move(self, board: Board, depth: int = None, time_limit: float = None,
+                  node_limit: int = None, token: SearchToken = None) -> tuple[Movement, float, int]:
+        """
+        Find the best move for the current side, depth is counted in plies.
+        With time_limit (seconds) or node_limit the search deepens 1, 2, 3... up to depth until the budget
+        runs out and the result of the last completed iteration is returned
+        Search stops early when cancel is called from another thread or the token is cancelled,
+        a token cancelled before the call stops the search at once
+        :return: move, score for white and number of visited positions, other statistics are kept in stats
+        """
         self.board = board
-        depth = depth or self.max_level
         color = self.board.current
         best_move = None
-        best_score = -9999 if color == Player.WHITE else 9999
+        best_score = -self.mate_score
+        self.stats = stats = SearchStats()
+
+        if time_limit is None and node_limit is None:
+            levels = [depth or self.max_level]
+        else:
+            levels = range(1, (depth or self.max_depth) + 1)
+        start = time.time()
 
-        total_variants = 0
-        pool = multiprocessing.Pool()
+        self.reset_counters()
+        self.depth_reached = 0
+        self.table.new_search()
+        self.table.reset_stats()
+        self.ordering.new_search()
+        self.noise_key = self.random.getrandbits(64) if self.variety else 0
 
+        moves = self.board.legal_moves(color)
+        if not moves:
+            return None, color * (-self.mate_score if self.board.test_for_check(color) else 0), 0
+
+        self.token = self.pool.acquire() if self.pool is not None else SearchToken()
+        self.caller_token = token
+        helpers = None
         try:
-            moves, all_moves = list(itertools.tee(self.board.valid_moves(color), 2))
-            func = functools.partial(self.estimate_move, 1, color, depth, -10000, +10000)
-            for score, variants in pool.imap(func, moves):
-                move = next(all_moves)
-                total_variants += variants
-                if (color == Player.WHITE and score > best_score) or (color == Player.BLACK and score < best_score) \
-                        or best_move is None:
-                    best_move = move
-                    best_score = score
+            if self.pool is not None and self.lazy_smp:
+                self.batch = self.pool.acquire()
+                helpers = self.pool.start_helpers(self.batch, encode_position(self.board), self.search_options(),
+                                                  levels[-1] + 1,
+                                                  None if time_limit is None else start + time_limit)
+            for level in levels:
+                # The first iteration always completes unless cancelled, so there is a move to return
+                first = level == levels[0]
+                self.deadline = None if first or time_limit is None else start + time_limit
+                self.node_limit = None if first or node_limit is None else node_limit
+                try:
+                    scores = self.aspiration_search(level, moves, None if first else best_score)
+                except SearchAborted:
+                    break
+
+                # Next iteration starts from the best moves of this one
+                scores.sort(key=lambda item: item[1], reverse=True)
+                moves = [move for move, score in scores]
+                best_move, best_score = scores[0]
+                self.depth_reached = level
+                stats.nodes_per_depth.append(self.variants - sum(stats.nodes_per_depth))
+                stats.time_per_depth.append(time.time() - start - sum(stats.time_per_depth))
+
+                if (time_limit is not None and time.time() - start >= time_limit) \
+                        or (node_limit is not None and self.variants >= node_limit):
+                    break
         finally:
-            pool.close()
-        return best_move, best_score, total_variants
+            self.deadline = self.node_limit = None
+            self.caller_token = None
+            if helpers is not None:
+                self.stop_helpers(helpers)
+            if self.pool is not None:
+                self.pool.release(self.token)
+            self.token = None
+            stats.depth = self.depth_reached
+            stats.nodes = self.variants
+            stats.quiescence_nodes = self.quiescence_variants
+            stats.cutoffs = self.cutoffs
+            stats.first_move_cutoffs = self.first_move_cutoffs
+            stats.table = self.table.stats()
+            stats.pruning = dict(self.pruning)
+            stats.time = time.time() - start
+        # Movement objects are built for the caller only
+        if best_move is not None:
+            best_move = self.board.movement(best_move)
+        return best_move, color * best_score, self.variants
 
-    def mini_max(self, variants: int, color: int, depth: int, alpha: float, beta: float) -> tuple[float, int]:
+    def stop_helpers(self, helpers: list) -> None:
+        self.batch.cancel()
+        try:
+            for result in helpers:
+                counters, table_stats = result.get()
+                self.add_search_counters(counters)
+                self.table.add_stats(table_stats)
+        finally:
+            self.pool.release(self.batch)
+            self.batch = None
+        pass
+
+    def search_helper(self, index: int, depth: int) -> tuple[dict, dict]:
+        """
+        Lazy SMP helper: deepen over the whole position until cancelled, odd helpers one ply ahead
+        and root moves rotated by the helper index, so helpers do not repeat each other.
+        Results reach the main search through the shared table only
+        :return: search counters and table statistics
+        """
+        self.table.reset_stats()
+        moves = self.board.legal_moves(self.board.current)
+        if moves:
+            shift = index % len(moves)
+            moves = moves[shift:] + moves[:shift]
+            try:
+                for level in range(1 + index % 2, depth + 1):
+                    scores = self.search_root(level, moves, -self.infinity, self.infinity)
+                    moves = [move for move, score in sorted(scores, key=lambda item: item[1], reverse=True)]
+            except SearchAborted:
+                pass
+        return self.search_counters(), self.table.stats()
+
+    def aspiration_search(self, depth: int, moves: list[int],
+                          expected: Union[float, None]) -> list[tuple[int, float]]:
+        """
+        Search root moves in a window around the expected score, widening it while the result falls outside
+        """
+        if expected is None:
+            return self.search_root(depth, moves, -self.infinity, self.infinity)
+
+        delta = self.aspiration_window
+        alpha, beta = expected - delta, expected + delta
+        while True:
+            scores = self.search_root(depth, moves, alpha, beta)
+            best = max(score for move, score in scores)
+            if best <= alpha and alpha > -self.infinity:
+                delta *= 4
+                alpha = max(expected - delta, -self.infinity) if delta < self.mate_score else -self.infinity
+            elif best >= beta and beta < self.infinity:
+                delta *= 4
+                beta = min(expected + delta, self.infinity) if delta < self.mate_score else self.infinity
+                # The move which failed high goes first in the re-search
+                moves = [move for move, score in sorted(scores, key=lambda item: item[1], reverse=True)]
+            else:
+                return scores
+
+    def negamax(self, depth: int, alpha: float, beta: float, ply: int) -> float:
         """
         Main method for computer chess
-        Make the best movement for current
+        Estimate the position for the side to move with alpha-beta search
         :return: Estimated position cost
         """
-        # At leaf return estimate
+        # At leaf search captures or return estimate
         if depth <= 0:
-            return self.estimate(), variants
+            if self.quiescence:
+                return self.quiesce(alpha, beta, ply)
+            self.variants += 1
+            return self.board.current * self.estimate()
+
+        self.variants += 1
+        self.check_budget()
+        color = self.board.current
+
+        # Scores with noise are kept apart from exact ones, the table may be shared by other searches
+        key = self.board.hash ^ self.noise_key
+        entry = self.table.probe(key)
+        hash_move = None
+        if entry is not None:
+            _, entry_depth, entry_score, bound, hash_move, _ = entry
+            if entry_depth >= depth:
+                entry_score = self.score_from_table(entry_score, ply)
+                if bound == Bound.EXACT \
+                        or (bound == Bound.LOWER and entry_score >= beta) \
+                        or (bound == Bound.UPPER and entry_score <= alpha):
+                    return entry_score
+
+        # Selective search is used away from mate scores and never in check
+        selective = (self.null_move or self.late_move_reductions or self.futility_pruning or self.razoring) \
+            and abs(alpha) < self.mate_score - self.max_depth * 2 \
+            and abs(beta) < self.mate_score - self.max_depth * 2 \
+            and not self.board.test_for_check(color)
+        static = color * self.estimate() if selective else None
+        if selective:
+            if self.razoring and depth <= 2 and static + self.razor_margin * depth <= alpha:
+                score = self.quiesce(alpha, alpha + self.null_window, ply)
+                if score <= alpha:
+                    self.pruning['razoring'] += 1
+                    return score
 
-        best_score = -9999 if color == Player.WHITE else 9999
+            if self.null_move and depth > self.null_move_reduction and static >= beta \
+                    and self.null_move_allowed(color):
+                # Give the opponent a free move: when the position still holds beta it is good enough
+                self.pruning['null_move'] += 1
+                self.board.null_move()
+                reduced = depth - 1 - self.null_move_reduction
+                score = None
+                if self.tracer is not None:
+                    self.tracer.enter(ply + 1, 0, reduced, -beta, -beta + self.null_window)
+                try:
+                    score = -self.negamax(reduced, -beta, -beta + self.null_window, ply + 1)
+                finally:
+                    if self.tracer is not None:
+                        self.tracer.leave(ply + 1, None if score is None else -score)
+                    self.board.rollback_null_move()
+                if score >= beta:
+                    self.pruning['null_move_cutoffs'] += 1
+                    return beta
 
-        # Generate all available movements in current position
-        for move in self.board.valid_moves(color):
-            # Move own figure
-            score, variants = self.estimate_move(variants+1, color, depth-1, alpha, beta, move)
+        futile = selective and self.futility_pruning and depth == 1 and static + self.futility_margin <= alpha
 
-            if color == Player.WHITE:
-                # We need select a move with max estimate
-                if score > best_score:
-                    best_score = score
-                if best_score > alpha:
-                    alpha = best_score
+        # Moves are generated stage by stage, most promising first, so a cutoff saves generating the rest
+        moves = self.ordering.staged(self.board, color, hash_move, ply, self.move_buffer(ply))
+
+        alpha_orig = alpha
+        best_score = -self.infinity
+        best_move = None
+        number = -1
+        for number, move in enumerate(moves):
+            quiet = MoveOrdering.is_quiet(move)
+            if number == 0:
+                score = self.search_move(move, depth, alpha, beta, ply)
+            elif futile and quiet:
+                # Frontier quiet move can't bring the estimate up to alpha
+                self.pruning['futility'] += 1
+                best_score = max(best_score, static + self.futility_margin)
+                continue
             else:
-                # else select a move with min estimate
-                if score < best_score:
-                    best_score = score
-                if best_score < beta:
-                    beta = best_score
+                reduction = 0
+                if selective and self.late_move_reductions and depth >= 3 and quiet \
+                        and number >= self.late_move_index:
+                    reduction = 1 if number < self.late_move_index * 2 else 2
+                    self.pruning['reductions'] += 1
+                # Prove that the move is not better than the best one with a null window
+                score = self.search_move(move, depth - reduction, alpha, alpha + self.null_window, ply)
+                if reduction and score > alpha:
+                    self.pruning['reduction_researches'] += 1
+                    score = self.search_move(move, depth, alpha, alpha + self.null_window, ply)
+                if alpha < score < beta:
+                    score = self.search_move(move, depth, alpha, beta, ply)
 
-            if beta <= alpha:
-                return best_score, variants
-        return best_score, variants
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.cutoffs += 1
+                if number == 0:
+                    self.first_move_cutoffs += 1
+                self.ordering.add_cutoff(move, depth, ply, color)
+                break
+
+        if number < 0:
+            # Mate is better the sooner it comes, stalemate is a draw
+            return -(self.mate_score - ply) if self.board.test_for_check(color) else 0
+
+        if best_score <= alpha_orig:
+            bound = Bound.UPPER
+        elif best_score >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.table.store(key, depth, self.score_to_table(best_score, ply), bound, best_move & MoveCode.KEY_MASK)
+        return best_score
+
+    def null_move_allowed(self, color: int) -> bool:
+        """
+        No two null moves in a row, and the side must have figures besides pawns and king:
+        in pawn endings zugzwang makes the free move assumption wrong
+        """
+        if self.board.after_null_move():
+            return False
+        return any(not isinstance(figure, (Pawn, King)) for figure in self.board.pieces[color].values())
+
+    def quiesce(self, alpha: float, beta: float, ply: int) -> float:
+        """
+        Search captures only (and check evasions when enabled) until the position is quiet,
+        so leaves are not estimated in the middle of an exchange
+        :return: Estimated position cost for the side to move
+        """
+        self.variants += 1
+        self.quiescence_variants += 1
+        self.check_budget()
+        color = self.board.current
+
+        if self.quiescence_evasions and self.board.test_for_check(color):
+            # No stand pat in check: every evasion is searched and no evasion is a mate
+            stand_pat = None
+            best_score = -self.infinity
+            moves = self.board.legal_moves(color, self.move_buffer(ply))
+            if not moves:
+                return -(self.mate_score - ply)
+        else:
+            stand_pat = best_score = color * self.estimate()
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = self.board.legal_moves(color, self.move_buffer(ply), captures=True)
+
+        figures = self.board.board
+        for move in self.ordering.order(moves, None, ply, color, figures):
+            # Delta pruning: even winning the figure doesn't bring the score up to alpha
+            if stand_pat is not None:
+                margin = stand_pat + self.capture_gain(move) + self.delta_margin
+                if margin <= alpha:
+                    # The skipped capture may still reach the margin, so the bound is not below it
+                    best_score = max(best_score, margin)
+                    continue
+            to_index = move >> 6 & 63
+            # Losing capture: a cheaper figure taken and the capturing one can be taken back
+            losing = stand_pat is not None and not move & (MoveCode.PROMOTION_MASK | MoveCode.PASSTHROUGH) \
+                and figures[move & 63]._price > figures[to_index]._price
+            self.board.make(move)
+            traced = False
+            score = None
+            try:
+                if losing and self.board.is_attacked(color, POSITIONS[to_index]):
+                    continue
+                if self.tracer is not None:
+                    traced = True
+                    self.tracer.enter(ply + 1, move, 0, -beta, -alpha)
+                score = -self.quiesce(-beta, -alpha, ply + 1)
+            finally:
+                if traced:
+                    self.tracer.leave(ply + 1, None if score is None else -score)
+                self.board.unmake()
+            if score > best_score:
+                best_score = score
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+        return best_score
+
+    def capture_gain(self, move: int) -> float:
+        """
+        Change of the board balance made by the move code for its side
+        """
+        gain = 0
+        if move & MoveCode.PASSTHROUGH:
+            gain += Pawn._price
+        elif move & MoveCode.CAPTURE:
+            gain += self.board.board[move >> 6 & 63]._price
+        if move & MoveCode.PROMOTION_MASK:
+            gain += PROMOTION_KINDS[move >> 12 & 7]._price - Pawn._price
+        return gain
+
+    def score_to_table(self, score: float, ply: int) -> float:
+        # Mate scores are stored relative to the position, not to the root
+        if score > self.mate_score - self.max_depth * 2:
+            return score + ply
+        if score < -self.mate_score + self.max_depth * 2:
+            return score - ply
+        return score
+
+    def score_from_table(self, score: float, ply: int) -> float:
+        if score > self.mate_score - self.max_depth * 2:
+            return score - ply
+        if score < -self.mate_score + self.max_depth * 2:
+            return score + ply
+        return score
 
     def estimate(self) -> float:
         """
@@ -102,9 +623,26 @@ class DecisionTree(object):
                     position_estimate += fig.price*0.5
 
         # Rook movement is preferred
-        for move in self.board.moves:
-            if move.rook is not None:
-                position_estimate += 2*move.rook.color
+        castled = self.board.castled
+        if castled & WHITE_CASTLED:
+            position_estimate += 2
+        if castled & BLACK_CASTLED:
+            position_estimate -= 2
+
+        # Piece-square scores blended from opening to endgame by material phase
+        phase = min(self.board.phase, MAX_PHASE)
+        position_estimate += (self.board.opening * phase + self.board.endgame * (MAX_PHASE - phase)) \
+            / (MAX_PHASE * 100)
 
-        estimate = quality_estimate + position_estimate + (random.random()-0.5)
+        estimate = quality_estimate + position_estimate
+        if self.variety:
+            estimate += self.noise()
         return estimate
+
+    def noise(self) -> float:
+        """
+        Pseudo random addition to the estimate derived from the position key,
+        so a position gets the same estimate in every process and from the transposition table
+        """
+        mixed = ((self.board.hash ^ self.noise_key) * 0x9e3779b97f4a7c15) & 0xffffffffffffffff
+        return self.variety * ((mixed >> 11) / (1 << 53) - 0.5)
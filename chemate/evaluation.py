@@ -0,0 +1,110 @@
+from chemate.core import Figure
+
+# Piece-square tables in hundredths of a pawn, written from the white side with the 8th rank first
+_PAWN = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+)
+_KNIGHT = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+_BISHOP = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+_ROOK = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+)
+_QUEEN = (
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+)
+_KING_OPENING = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+)
+_KING_ENDGAME = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+)
+
+
+def _scores(table: tuple) -> dict:
+    # White reads the table from the 1st rank up, black sees it mirrored and scores are negative for black
+    return {
+        'white': tuple(table[(7 - index // 8) * 8 + index % 8] for index in range(64)),
+        'black': tuple(-table[index] for index in range(64)),
+    }
+
+
+def _by_char(tables: dict) -> dict:
+    result = {}
+    for char, table in tables.items():
+        scores = _scores(table)
+        result[char.upper()] = scores['white']
+        result[char] = scores['black']
+    return result
+
+
+OPENING_SCORES = _by_char({'p': _PAWN, 'n': _KNIGHT, 'b': _BISHOP, 'r': _ROOK, 'q': _QUEEN, 'k': _KING_OPENING})
+ENDGAME_SCORES = _by_char({'p': _PAWN, 'n': _KNIGHT, 'b': _BISHOP, 'r': _ROOK, 'q': _QUEEN, 'k': _KING_ENDGAME})
+
+# Material phase: 24 with all figures on the board, 0 when only kings and pawns are left
+PHASE_WEIGHTS = {char: weight for chars, weight in (('Pp', 0), ('Nn', 1), ('Bb', 1), ('Rr', 2), ('Qq', 4), ('Kk', 0))
+                 for char in chars}
+MAX_PHASE = 24
+
+# Castled bits
+WHITE_CASTLED, BLACK_CASTLED = 1, 2
+
+
+def square_scores(figure: Figure, index: int) -> tuple[int, int]:
+    """
+    Opening and endgame piece-square scores of the figure on the square, positive for white
+    """
+    char = figure.char
+    return OPENING_SCORES[char][index], ENDGAME_SCORES[char][index]
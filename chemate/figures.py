@@ -1,89 +1,59 @@
-from typing import Iterator
+from typing import Sequence
 
-from chemate.directions import Up, Down, Left, Right, UpRight, UpLeft, DownRight, DownLeft
-from chemate.core import Position, Player, Figure, Direction
+from chemate.core import Position, Player, Figure
+from chemate.tables import ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS, KNIGHT_HOPS, KING_HOPS, KING_ROOKING_HOPS, \
+    PAWN_ATTACKS, PAWN_MOVES
 
 
 class Pawn(Figure):
+    __slots__ = ()
     _price = 1
     _char = 'p'
 
-    def directions(self, attack: bool = False) -> Iterator[Direction]:
-        if self.color == Player.WHITE:
-            yield UpRight(self.position, limit=1)
-            yield UpLeft(self.position, limit=1)
-        else:
-            yield DownRight(self.position, limit=1)
-            yield DownLeft(self.position, limit=1)
-
-        if not attack:
-            if self.color == Player.WHITE:
-                yield Up(self.position, limit=2 if self.position.y == 1 else 1)
-            else:
-                yield Down(self.position, limit=2 if self.position.y == 6 else 1)
-        pass
+    def directions(self, attack: bool = False) -> Sequence[Sequence[Position]]:
+        if attack:
+            return PAWN_ATTACKS[self.color][self.position.index]
+        return PAWN_MOVES[self.color][self.position.index]
 
 
 class Bishop(Figure):
+    __slots__ = ()
     _price = 3
     _char = 'b'
 
-    def directions(self, attack: bool = False) -> Iterator[Direction]:
-        yield UpLeft(self.position)
-        yield UpRight(self.position)
-        yield DownLeft(self.position)
-        yield DownRight(self.position)
+    def directions(self, attack: bool = False) -> Sequence[Sequence[Position]]:
+        return BISHOP_RAYS[self.position.index]
 
 
 class Knight(Figure):
+    __slots__ = ()
     _price = 3
     _char = 'n'
 
-    def directions(self, attack: bool = False) -> Iterator[Direction]:
-        all_positions = [
-            (self.position.x + 1, self.position.y + 2),
-            (self.position.x + 2, self.position.y + 1),
-            (self.position.x + 2, self.position.y - 1),
-            (self.position.x + 1, self.position.y - 2),
-            (self.position.x - 1, self.position.y - 2),
-            (self.position.x - 2, self.position.y - 1),
-            (self.position.x - 2, self.position.y + 1),
-            (self.position.x - 1, self.position.y + 2)
-        ]
-        for x, y in all_positions:
-            if x < 0 or x > 7 or y < 0 or y > 7:
-                continue
-            yield Direction(Position.from_xy(x, y), limit=1)
-        pass
+    def directions(self, attack: bool = False) -> Sequence[Sequence[Position]]:
+        return KNIGHT_HOPS[self.position.index]
 
 
 class Rook(Figure):
+    __slots__ = ()
     _price = 5
     _char = 'r'
 
-    def directions(self, attack: bool = False) -> Iterator[Direction]:
-        yield Up(self.position)
-        yield Down(self.position)
-        yield Left(self.position)
-        yield Right(self.position)
+    def directions(self, attack: bool = False) -> Sequence[Sequence[Position]]:
+        return ROOK_RAYS[self.position.index]
 
 
 class Queen(Figure):
+    __slots__ = ()
     _price = 9
     _char = 'q'
 
-    def directions(self, attack: bool = False) -> Iterator[Direction]:
-        yield Up(self.position)
-        yield Down(self.position)
-        yield Left(self.position)
-        yield Right(self.position)
-        yield UpLeft(self.position)
-        yield UpRight(self.position)
-        yield DownLeft(self.position)
-        yield DownRight(self.position)
+    def directions(self, attack: bool = False) -> Sequence[Sequence[Position]]:
+        return QUEEN_RAYS[self.position.index]
 
 
 class King(Figure):
+    __slots__ = ()
     _price = 999
     _char = 'k'
 
@@ -92,15 +62,11 @@ class King(Figure):
             return self.position.index == 4
         return self.position.index == 60
 
-    def directions(self, attack: bool = False) -> Iterator[Direction]:
-        rooking = 2 if not attack and self.moves == 0 and self.initial_pos() else 1
+    def directions(self, attack: bool = False) -> Sequence[Sequence[Position]]:
+        if not attack and self.moves == 0 and self.initial_pos():
+            return KING_ROOKING_HOPS[self.position.index]
+        return KING_HOPS[self.position.index]
 
-        yield Up(self.position, limit=1)
-        yield Down(self.position, limit=1)
-        yield Left(self.position, limit=rooking)
-        yield Right(self.position, limit=rooking)
-        yield UpLeft(self.position, limit=1)
-        yield UpRight(self.position, limit=1)
-        yield DownLeft(self.position, limit=1)
-        yield DownRight(self.position, limit=1)
 
+# Promotion figures by MoveCode promotion number
+PROMOTION_KINDS = (None, Queen, Rook, Bishop, Knight)
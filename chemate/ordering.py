@@ -0,0 +1,119 @@
+from typing import Iterator, Union
+
+from chemate.board import Board
+from chemate.core import MoveCode, Player
+from chemate.figures import Pawn, PROMOTION_KINDS
+
+
+class MoveOrdering(object):
+    """
+    Order moves for alpha-beta search: hash move, captures by most valuable victim / least valuable
+    attacker, killer moves of the ply and then quiet moves by history heuristic
+    """
+    hash_score = 1 << 30
+    capture_score = 1 << 28
+    killer_score = 1 << 26
+    killers_per_ply = 2
+
+    def __init__(self) -> None:
+        self.killers = []
+        self.history = {Player.WHITE: {}, Player.BLACK: {}}
+
+    def clear(self) -> None:
+        self.killers = []
+        self.history = {Player.WHITE: {}, Player.BLACK: {}}
+
+    def new_search(self) -> None:
+        """
+        Forget killers and age history scores, so the results of the previous search don't dominate
+        """
+        self.killers = []
+        for color, history in self.history.items():
+            self.history[color] = {key: score // 2 for key, score in history.items() if score > 1}
+
+    @staticmethod
+    def is_quiet(code: int) -> bool:
+        return not code & (MoveCode.CAPTURE | MoveCode.PROMOTION_MASK)
+
+    def score(self, code: int, hash_move: Union[int, None], killers: list, history: dict, figures: list) -> int:
+        key = code & MoveCode.KEY_MASK
+        if key == hash_move:
+            return self.hash_score
+        if not self.is_quiet(code):
+            victim = 0
+            if code & MoveCode.PASSTHROUGH:
+                victim = Pawn._price
+            elif code & MoveCode.CAPTURE:
+                victim = figures[code >> 6 & 63]._price
+            if code & MoveCode.PROMOTION_MASK:
+                victim += PROMOTION_KINDS[code >> 12 & 7]._price
+            # King price is not a material value, so the attacker cost is capped
+            return self.capture_score + victim * 16 - min(figures[code & 63]._price, 15)
+        if key in killers:
+            return self.killer_score + self.killers_per_ply - killers.index(key)
+        return history.get(key, 0)
+
+    def order(self, codes: list[int], hash_move: Union[int, None], ply: int, color: int,
+              figures: list) -> list[int]:
+        """
+        Sort move codes of the position in place, figures is the square list of the board
+        """
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[color]
+        codes.sort(key=lambda code: self.score(code, hash_move, killers, history, figures), reverse=True)
+        return codes
+
+    def staged(self, board: Board, color: int, hash_move: Union[int, None], ply: int, codes: list) -> Iterator[int]:
+        """
+        Legal moves of the side to move in the order of order(), generated stage by stage as the search
+        asks for them: hash move, captures and promotions, killers, quiet moves by history.
+        codes is the buffer of the ply, filled with captures and then with quiet moves
+        """
+        safety = board.king_safety(color)
+        tried = []
+        if hash_move is not None:
+            code = board.find_move(hash_move, safety)
+            if code is not None:
+                tried.append(hash_move)
+                yield code
+
+        figures = board.board
+        board.legal_moves(color, codes, True, safety)
+        if codes:
+            codes.sort(key=lambda code: self.score(code, None, (), {}, figures), reverse=True)
+            for code in codes:
+                if code & MoveCode.KEY_MASK != hash_move:
+                    yield code
+
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        for key in killers:
+            if key != hash_move:
+                code = board.find_move(key, safety)
+                if code is not None and self.is_quiet(code):
+                    tried.append(key)
+                    yield code
+
+        board.legal_moves(color, codes, False, safety)
+        if codes:
+            history = self.history[color]
+            codes.sort(key=lambda code: history.get(code & MoveCode.KEY_MASK, 0), reverse=True)
+            for code in codes:
+                if code & MoveCode.KEY_MASK not in tried:
+                    yield code
+        pass
+
+    def add_cutoff(self, code: int, depth: int, ply: int, color: int) -> None:
+        """
+        Remember a quiet move that caused beta cutoff
+        """
+        if not self.is_quiet(code):
+            return
+        key = code & MoveCode.KEY_MASK
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if key not in killers:
+            killers.insert(0, key)
+            del killers[self.killers_per_ply:]
+        history = self.history[color]
+        history[key] = history.get(key, 0) + depth * depth
@@ -0,0 +1,166 @@
+"""
+Move generator check and benchmark: count leaf positions of the legal move tree (perft).
+
+    python -m chemate.perft                       all bundled positions at depth 3
+    python -m chemate.perft kiwipete -d 4 --divide
+    python -m chemate.perft "8/8/8/8/8/8/8/K1k5 w - - 0 1" -d 5 --hash
+    python -m chemate.perft --compare -d 3        Board against BitBoard, differences are reported
+"""
+import argparse
+import sys
+import time
+from typing import Type, Union
+
+from chemate.bitboard import BitBoard
+from chemate.board import Board
+from chemate.core import MoveCode
+from chemate.positions import PredefinedFENPosition
+
+BOARDS = {'board': Board, 'bitboard': BitBoard}
+
+# Standard perft positions with known node counts for depth 1, 2, 3...
+POSITIONS = {
+    'initial': ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                (20, 400, 8902, 197281, 4865609)),
+    # Rooking through attacked squares, pins and passthrough captures in the middle game
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 (48, 2039, 97862, 4085603)),
+    # Passthrough captures exposing the king along the rank
+    'passthrough': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                    (14, 191, 2812, 43238, 674624)),
+    # Promotions with and without capture, rooking rights of one side only
+    'promotion': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                  (6, 264, 9467, 422333)),
+    'promotion-check': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                        (44, 1486, 62379, 2103487)),
+    'middlegame': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                   (46, 2079, 89890, 3894594)),
+}
+
+
+def create_board(fen: str, kind: Type[Board] = Board) -> Board:
+    board = kind()
+    board.init(PredefinedFENPosition(fen))
+    return board
+
+
+def perft(board: Board, depth: int, table: dict = None) -> int:
+    """
+    Number of leaf positions of the legal move tree of the depth.
+    With a table counts of repeated subtrees are taken by position key
+    """
+    if depth == 0:
+        return 1
+    codes = board.legal_moves(board.current)
+    if depth == 1:
+        return len(codes)
+    if table is not None:
+        key = (board.hash, depth)
+        nodes = table.get(key)
+        if nodes is not None:
+            return nodes
+    nodes = 0
+    for code in codes:
+        board.make(code)
+        nodes += perft(board, depth - 1, table)
+        board.unmake()
+    if table is not None:
+        table[key] = nodes
+    return nodes
+
+
+def divide(board: Board, depth: int, table: dict = None) -> dict[str, int]:
+    """
+    Perft of the depth split by the first move
+    """
+    result = {}
+    for code in board.legal_moves(board.current):
+        board.make(code)
+        result[MoveCode.name(code)] = perft(board, depth - 1, table)
+        board.unmake()
+    return result
+
+
+def compare(fen: str, depth: int, first: Type[Board] = Board,
+            second: Type[Board] = BitBoard) -> list[tuple[str, list[str], list[str]]]:
+    """
+    Walk the move tree of both board implementations and compare legal moves in every position
+    :return: moves leading to the position, moves found by the first board only and by the second only
+    """
+    differences = []
+
+    def walk(boards: tuple[Board, Board], path: list[str], depth: int) -> None:
+        moves = [{MoveCode.name(code): code for code in board.legal_moves(board.current)} for board in boards]
+        if moves[0].keys() != moves[1].keys():
+            differences.append((' '.join(path), sorted(moves[0].keys() - moves[1].keys()),
+                                sorted(moves[1].keys() - moves[0].keys())))
+        if depth <= 1:
+            return
+        for name in sorted(moves[0].keys() & moves[1].keys()):
+            for board, codes in zip(boards, moves):
+                board.make(codes[name])
+            walk(boards, path + [name], depth - 1)
+            for board in boards:
+                board.unmake()
+        pass
+
+    walk((create_board(fen, first), create_board(fen, second)), [], depth)
+    return differences
+
+
+def resolve(position: str) -> tuple[str, str, Union[tuple, None]]:
+    """
+    Name, FEN and known counts of a bundled position given by name, or of a FEN
+    """
+    if position in POSITIONS:
+        fen, counts = POSITIONS[position]
+        return position, fen, counts
+    return position, position, None
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m chemate.perft', description=__doc__.split('\n')[1])
+    parser.add_argument('positions', nargs='*', help='bundled position names or FEN strings, all bundled by default')
+    parser.add_argument('-d', '--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help='print counts by the first move')
+    parser.add_argument('--hash', action='store_true', help='take counts of repeated subtrees by position key')
+    parser.add_argument('--board', choices=BOARDS, default='board')
+    parser.add_argument('--compare', nargs='?', const='bitboard', choices=BOARDS,
+                        help='compare legal moves with another board implementation in every position')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for position in args.positions or POSITIONS:
+        name, fen, counts = resolve(position)
+        if args.compare:
+            differences = compare(fen, args.depth, BOARDS[args.board], BOARDS[args.compare])
+            for path, first, second in differences:
+                print(f'{name}: after [{path}] {args.board} only {first}, {args.compare} only {second}')
+            print(f'{name}: {len(differences)} differences up to depth {args.depth}')
+            failed = failed or bool(differences)
+            continue
+
+        board = create_board(fen, BOARDS[args.board])
+        table = {} if args.hash else None
+        started = time.perf_counter()
+        if args.divide:
+            result = divide(board, args.depth, table)
+            for move, count in sorted(result.items()):
+                print(f'{move}: {count}')
+            nodes = sum(result.values())
+        else:
+            nodes = perft(board, args.depth, table)
+        elapsed = time.perf_counter() - started
+
+        status = ''
+        if counts is not None and args.depth <= len(counts):
+            expected = counts[args.depth - 1]
+            status = 'ok' if nodes == expected else f'FAILED, expected {expected}'
+            failed = failed or nodes != expected
+        print(f'{name}: depth {args.depth} nodes {nodes} time {elapsed:.2f}s '
+              f'nps {nodes / elapsed if elapsed else 0:.0f} {status}'.rstrip())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
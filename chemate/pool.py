@@ -0,0 +1,171 @@
+import functools
+import multiprocessing.pool
+import os
+import threading
+from typing import Iterator, Union
+
+from chemate.board import Board
+from chemate.positions import PredefinedFENPosition
+from chemate.transposition import SharedTranspositionTable
+from chemate.utils import FENExporter
+
+# State of a worker process, kept between tasks
+_worker = {}
+
+
+class SearchToken(object):
+    """
+    Cancellation flag of one search, visible to all processes working on it.
+    The slot keeps the generation of the search using it, the search is cancelled when the slot changes,
+    so tasks left from an earlier search of the same slot stay cancelled when the slot is reused
+    """
+    __slots__ = ['flags', 'slot', 'generation']
+
+    def __init__(self, flags=None, slot: int = 0, generation: int = 1) -> None:
+        self.flags = flags if flags is not None else [generation]
+        self.slot = slot
+        self.generation = generation
+
+    @property
+    def cancelled(self) -> bool:
+        return self.flags[self.slot] != self.generation
+
+    def cancel(self) -> None:
+        # A token kept after release must not cancel the next search of the slot
+        if self.flags[self.slot] == self.generation:
+            self.flags[self.slot] = 0
+
+
+def encode_position(board: Board) -> tuple[str, tuple[int, ...]]:
+    """
+    Compact form of the board for worker processes: FEN of the position before the moves made
+    and keys of these moves, so the history is kept
+    """
+    moves = list(board.moves)
+    for _ in moves:
+        board.rollback()
+    try:
+        fen = board.export(FENExporter)
+    finally:
+        for move in moves:
+            board.move(move, test_mode=True)
+    return fen, tuple(move.key for move in moves)
+
+
+def decode_position(position: tuple[str, tuple[int, ...]]) -> Board:
+    fen, keys = position
+    board = Board()
+    board.init(PredefinedFENPosition(fen))
+    for key in keys:
+        board.move(next(move for move in board.valid_moves(board.current) if move.key == key))
+    return board
+
+
+def _init_worker(flags, table: SharedTranspositionTable) -> None:
+    from chemate.decision import DecisionTree
+
+    decision = DecisionTree(0, table_memory=0)
+    decision.table = table.view()
+    _worker['flags'] = flags
+    _worker['position'] = None
+    _worker['board'] = None
+    _worker['decision'] = decision
+
+
+def _prepare_worker(position: tuple[str, tuple[int, ...]], slot: int, generation: int, options: dict,
+                    deadline: Union[float, None], node_limit: Union[int, None]):
+    decision = _worker['decision']
+    for name, value in options.items():
+        setattr(decision, name, value)
+    if _worker['position'] != position:
+        # Tasks of one search come one by one, so the board is rebuilt once per search
+        _worker['board'] = decode_position(position)
+        _worker['position'] = position
+        decision.ordering.new_search()
+
+    decision.board = _worker['board']
+    decision.token = SearchToken(_worker['flags'], slot, generation)
+    decision.deadline = deadline
+    decision.node_limit = node_limit
+    decision.reset_counters()
+    return decision
+
+
+def _search_task(position: tuple[str, tuple[int, ...]], slot: int, generation: int, options: dict, depth: int,
+                 alpha: float, beta: float, deadline: Union[float, None], node_limit: Union[int, None],
+                 move: int) -> tuple[Union[float, None], dict, dict]:
+    decision = _prepare_worker(position, slot, generation, options, deadline, node_limit)
+    return decision.search_root_move(depth, alpha, beta, move)
+
+
+def _helper_task(position: tuple[str, tuple[int, ...]], slot: int, generation: int, options: dict, index: int,
+                 depth: int, deadline: Union[float, None]) -> tuple[dict, dict]:
+    decision = _prepare_worker(position, slot, generation, options, deadline, None)
+    return decision.search_helper(index, depth)
+
+
+class SearchPool(object):
+    """
+    Long living pool of search worker processes, created once by the application and shared by searches.
+    Workers get positions as FEN with keys of the moves made, every search has its own cancellation token.
+    All processes share one transposition table
+    """
+    def __init__(self, workers: int = None, searches: int = 256, table_memory: int = 16 * 1024 * 1024) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.flags = multiprocessing.Array('q', searches, lock=False)
+        self.free = list(range(searches))
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.table = SharedTranspositionTable(table_memory)
+        self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(self.flags, self.table))
+
+    def acquire(self) -> SearchToken:
+        with self.lock:
+            if not self.free:
+                raise RuntimeError('Too many concurrent searches')
+            slot = self.free.pop()
+            self.generation += 1
+            generation = self.generation
+        self.flags[slot] = generation
+        return SearchToken(self.flags, slot, generation)
+
+    def release(self, token: SearchToken) -> None:
+        """
+        Return the slot of the token, tasks of the search still queued are cancelled
+        """
+        token.cancel()
+        with self.lock:
+            self.free.append(token.slot)
+
+    def search_moves(self, token: SearchToken, position: tuple[str, tuple[int, ...]], options: dict,
+                     moves: list[int], depth: int, alpha: float, beta: float, deadline: Union[float, None],
+                     node_limit: Union[int, None]) -> Iterator[tuple[Union[float, None], dict, dict]]:
+        """
+        Estimate root moves given as MoveCode ints in worker processes, options are search settings of DecisionTree
+        :return: score or None when aborted, search counters and table statistics for every move in order
+        """
+        func = functools.partial(_search_task, position, token.slot, token.generation, options, depth, alpha, beta,
+                                 deadline, node_limit)
+        return self.pool.imap(func, moves)
+
+    def start_helpers(self, token: SearchToken, position: tuple[str, tuple[int, ...]], options: dict, depth: int,
+                      deadline: Union[float, None]) -> list[multiprocessing.pool.AsyncResult]:
+        """
+        Start Lazy SMP helpers: every worker searches the whole position and fills the shared table
+        until the token is cancelled
+        :return: results with search counters and table statistics of every helper
+        """
+        return [self.pool.apply_async(_helper_task, (position, token.slot, token.generation, options, index, depth,
+                                                     deadline))
+                for index in range(self.workers)]
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
+        self.table.close()
+
+    def __enter__(self) -> 'SearchPool':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
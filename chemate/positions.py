@@ -11,6 +11,7 @@ class PositionFactory:
         board.clear()
         board.put_figures(self.figures())
         board.current = Player.WHITE
+        board.rehash()
 
     @abstractmethod
     def figures(self) -> Iterator[Figure]:
@@ -63,14 +64,17 @@ class PredefinedFENPosition(PositionFactory):
 
         board.move_number = int(self.move_no)
         for char in iter(self.rooking):
-            if char == 'Q':
-                self.set_rooking_state(board, Position.from_char('h1'), Player.WHITE, True)
             if char == 'K':
+                self.set_rooking_state(board, Position.from_char('h1'), Player.WHITE, True)
+            if char == 'Q':
                 self.set_rooking_state(board, Position.from_char('a1'), Player.WHITE, True)
-            if char == 'q':
-                self.set_rooking_state(board, Position.from_char('h8'), Player.BLACK, True)
             if char == 'k':
+                self.set_rooking_state(board, Position.from_char('h8'), Player.BLACK, True)
+            if char == 'q':
                 self.set_rooking_state(board, Position.from_char('a8'), Player.BLACK, True)
+
+        board.passthrough = Position.from_char(self.passthru) if self.passthru != '-' else None
+        board.rehash()
         pass
 
     @staticmethod
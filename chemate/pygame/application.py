@@ -7,6 +7,7 @@ import pygame_gui as gui
 from .board import BoardCanvas
 from ..board import Board
 from ..decision import DecisionTree
+from ..pool import SearchPool
 from ..positions import InitialPosition
 from ..core import Player, Movement
 from multiprocessing import Process, Queue
@@ -14,12 +15,14 @@ from multiprocessing import Process, Queue
 
 def decision_process(queue: Queue, result: Queue):
     print('decision process started')
-    decision = DecisionTree(3)
-    while True:
-        board = queue.get()
-        move, score, variants = decision.best_move(board)
-        # print(f'Best move {move}. score {score}. variants: {variants}')
-        result.put(move)
+    with SearchPool() as pool:
+        # Games against the computer should not repeat
+        decision = DecisionTree(2, pool=pool, variety=1.0)
+        while True:
+            board = queue.get()
+            move, score, variants = decision.best_move(board)
+            # print(f'Best move {move}. score {score}. variants: {variants}')
+            result.put(move)
     pass
 
 
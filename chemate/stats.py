@@ -0,0 +1,88 @@
+import json
+from typing import TextIO, Union
+
+from chemate.core import MoveCode
+
+
+class SearchStats(object):
+    """
+    Statistics of one best_move search, nodes of pool workers included
+    """
+    def __init__(self) -> None:
+        # Depth of the last completed iteration
+        self.depth = 0
+        # Nodes visited, quiescence nodes included, and quiescence nodes alone
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        # Nodes and seconds spent by each completed iteration of iterative deepening
+        self.nodes_per_depth = []
+        self.time_per_depth = []
+        # Beta cutoffs and the ones made by the first move searched in the node
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Transposition table and selective search statistics as kept by DecisionTree
+        self.table = {}
+        self.pruning = {}
+        self.time = 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.time if self.time else 0.0
+
+    @property
+    def branching_factor(self) -> Union[float, None]:
+        """
+        Effective branching factor: growth of nodes from the previous iteration,
+        or the depth root of the nodes of a single iteration
+        """
+        nodes = self.nodes_per_depth
+        if len(nodes) > 1 and nodes[-2]:
+            return nodes[-1] / nodes[-2]
+        if nodes and self.depth:
+            return nodes[-1] ** (1 / self.depth)
+        return None
+
+    def as_dict(self) -> dict:
+        return {'depth': self.depth, 'nodes': self.nodes, 'quiescence_nodes': self.quiescence_nodes,
+                'nodes_per_depth': list(self.nodes_per_depth), 'time_per_depth': list(self.time_per_depth),
+                'cutoffs': self.cutoffs, 'first_move_cutoffs': self.first_move_cutoffs,
+                'first_move_cutoff_rate': self.first_move_cutoff_rate, 'table': dict(self.table),
+                'pruning': dict(self.pruning), 'time': self.time, 'nps': self.nps,
+                'branching_factor': self.branching_factor}
+
+
+class SearchTracer(object):
+    """
+    Callbacks of the search made in this process: a position is entered after the move code
+    (0 for the null move) is made and left with its score for the side to move there.
+    Depth 0 and below is quiescence search
+    """
+    def enter(self, ply: int, move: int, depth: int, alpha: float, beta: float) -> None:
+        pass
+
+    def leave(self, ply: int, score: Union[float, None]) -> None:
+        pass
+
+
+class TreeDumpTracer(SearchTracer):
+    """
+    Write the search tree as JSON lines: {"ply", "move", "depth", "alpha", "beta"} when a position is entered
+    and {"ply", "score"} when it is left, score is null when the search was aborted there.
+    Positions deeper than max_ply are not written
+    """
+    def __init__(self, stream: TextIO, max_ply: int = None) -> None:
+        self.stream = stream
+        self.max_ply = max_ply
+
+    def enter(self, ply: int, move: int, depth: int, alpha: float, beta: float) -> None:
+        if self.max_ply is None or ply <= self.max_ply:
+            self.stream.write(json.dumps({'ply': ply, 'move': MoveCode.name(move) if move else 'null',
+                                          'depth': depth, 'alpha': alpha, 'beta': beta}) + '\n')
+
+    def leave(self, ply: int, score: Union[float, None]) -> None:
+        if self.max_ply is None or ply <= self.max_ply:
+            self.stream.write(json.dumps({'ply': ply, 'score': score}) + '\n')
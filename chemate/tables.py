@@ -0,0 +1,69 @@
+from chemate.core import Player, Direction
+
+POSITIONS = Direction.all_positions
+
+# Rays and hops for every square, computed once at import time.
+# Each entry is a tuple of rays and every ray is a tuple of positions ordered from the square outwards
+UP, DOWN, LEFT, RIGHT, UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT = range(8)
+_STEPS = ((0, 1), (0, -1), (-1, 0), (1, 0), (-1, 1), (1, 1), (-1, -1), (1, -1))
+_KNIGHT_STEPS = ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+
+
+def _ray(index: int, dx: int, dy: int, limit: int = 7) -> tuple:
+    x, y = index % 8 + dx, index // 8 + dy
+    squares = []
+    while 0 <= x <= 7 and 0 <= y <= 7 and len(squares) < limit:
+        squares.append(POSITIONS[y * 8 + x])
+        x, y = x + dx, y + dy
+    return tuple(squares)
+
+
+def _hops(index: int, steps) -> tuple:
+    return tuple(ray for ray in (_ray(index, dx, dy, 1) for dx, dy in steps) if ray)
+
+
+def _mask(rays) -> int:
+    bits = 0
+    for ray in rays:
+        for pos in ray:
+            bits |= 1 << pos.index
+    return bits
+
+
+RAYS = tuple(tuple(_ray(index, dx, dy) for index in range(64)) for dx, dy in _STEPS)
+
+ROOK_RAYS = tuple((RAYS[UP][i], RAYS[DOWN][i], RAYS[LEFT][i], RAYS[RIGHT][i]) for i in range(64))
+BISHOP_RAYS = tuple((RAYS[UP_LEFT][i], RAYS[UP_RIGHT][i], RAYS[DOWN_LEFT][i], RAYS[DOWN_RIGHT][i])
+                    for i in range(64))
+QUEEN_RAYS = tuple(ROOK_RAYS[i] + BISHOP_RAYS[i] for i in range(64))
+
+KNIGHT_HOPS = tuple(_hops(i, _KNIGHT_STEPS) for i in range(64))
+KING_HOPS = tuple(_hops(i, _STEPS) for i in range(64))
+# King hops where left and right rays are two squares long, used while rooking is still possible
+KING_ROOKING_HOPS = tuple(
+    tuple(ray for ray in (_ray(i, dx, dy, 2 if dy == 0 else 1) for dx, dy in _STEPS) if ray)
+    for i in range(64)
+)
+
+PAWN_ATTACKS = {
+    Player.WHITE: tuple(_hops(i, ((1, 1), (-1, 1))) for i in range(64)),
+    Player.BLACK: tuple(_hops(i, ((1, -1), (-1, -1))) for i in range(64)),
+}
+# Pawn attacks followed by the forward ray, which is two squares long on the initial line
+PAWN_MOVES = {
+    Player.WHITE: tuple(PAWN_ATTACKS[Player.WHITE][i] + (_ray(i, 0, 1, 2 if i // 8 == 1 else 1),)
+                        for i in range(64)),
+    Player.BLACK: tuple(PAWN_ATTACKS[Player.BLACK][i] + (_ray(i, 0, -1, 2 if i // 8 == 6 else 1),)
+                        for i in range(64)),
+}
+
+KNIGHT_MASKS = tuple(_mask(hops) for hops in KNIGHT_HOPS)
+KING_MASKS = tuple(_mask(hops) for hops in KING_HOPS)
+PAWN_ATTACK_MASKS = {color: tuple(_mask(hops) for hops in attacks) for color, attacks in PAWN_ATTACKS.items()}
+
+# Sliding ray masks as (positive, masks) pairs: positive rays grow to higher indexes,
+# so the nearest blocker is the lowest set bit, otherwise the highest one
+ROOK_RAY_MASKS = tuple((_STEPS[d][0] + _STEPS[d][1] * 8 > 0, tuple(_mask((ray,)) for ray in RAYS[d]))
+                       for d in (UP, DOWN, LEFT, RIGHT))
+BISHOP_RAY_MASKS = tuple((_STEPS[d][0] + _STEPS[d][1] * 8 > 0, tuple(_mask((ray,)) for ray in RAYS[d]))
+                         for d in (UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT))
@@ -0,0 +1,198 @@
+import struct
+from multiprocessing import shared_memory
+from typing import Union
+
+
+class Bound(object):
+    """
+    Constants for kind of score stored in the table
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TranspositionTable(object):
+    """
+    Fixed size table of search results keyed by position hash.
+    Every bucket has a depth-preferred slot and an always-replace slot
+    """
+    # Approximate memory taken by one stored entry: the slot, the tuple and its integers
+    entry_size = 160
+
+    def __init__(self, memory: int = 16 * 1024 * 1024) -> None:
+        self.memory = memory
+        self.buckets = max(1, memory // (2 * self.entry_size))
+        self.slots = [None] * (self.buckets * 2)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self) -> None:
+        self.slots = [None] * (self.buckets * 2)
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def new_search(self) -> None:
+        """
+        Mark entries stored so far as old, so the depth-preferred slots can be reused
+        """
+        self.generation += 1
+
+    def probe(self, key: int) -> Union[tuple, None]:
+        """
+        Find entry for the position
+        :return: (key, depth, score, bound, move, generation) or None
+        """
+        index = (key % self.buckets) * 2
+        for entry in (self.slots[index], self.slots[index + 1]):
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, move: Union[int, None]) -> None:
+        index = (key % self.buckets) * 2
+        entry = (key, depth, score, bound, move, self.generation)
+        current = self.slots[index]
+        if current is None or current[0] == key or current[1] <= depth or current[5] != self.generation:
+            if current is not None and current[0] != key:
+                self.overwrites += 1
+            self.slots[index] = entry
+        else:
+            if self.slots[index + 1] is not None and self.slots[index + 1][0] != key:
+                self.overwrites += 1
+            self.slots[index + 1] = entry
+        self.stores += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores,
+                'overwrites': self.overwrites, 'hit_rate': self.hit_rate}
+
+    def add_stats(self, stats: dict) -> None:
+        """
+        Account statistics collected by a copy of the table in another process
+        """
+        self.hits += stats['hits']
+        self.misses += stats['misses']
+        self.stores += stats['stores']
+        self.overwrites += stats['overwrites']
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Transposition table in shared memory, used by several search processes at once without locks.
+    Every entry is three 64-bit words: key ^ data ^ score, data and score, so an entry torn
+    by concurrent writers does not match its key and is ignored
+    """
+    entry_size = 24
+    # Data word layout: move, depth, bound and generation
+    _depth_shift = 16
+    _bound_shift = 24
+    _generation_shift = 26
+
+    def __init__(self, memory: int = 16 * 1024 * 1024, name: str = None) -> None:
+        self.memory = memory
+        self.buckets = max(1, memory // (2 * self.entry_size))
+        # The first word keeps generation of the table
+        size = 8 * (1 + self.buckets * 2 * 3)
+        self.owner = name is None
+        self.shared = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.name = self.shared.name
+        self.words = self.shared.buf.cast('Q')
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def __getstate__(self) -> dict:
+        return {'memory': self.memory, 'name': self.name}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state['memory'], state['name'])
+
+    def view(self) -> 'SharedTranspositionTable':
+        """
+        Table over the same memory with statistics of its own
+        """
+        view = object.__new__(self.__class__)
+        view.__dict__.update(self.__dict__)
+        view.owner = False
+        view.shared = None
+        view.reset_stats()
+        return view
+
+    def close(self) -> None:
+        # Views leave the memory to the table they were made from
+        if self.shared is None:
+            return
+        self.words.release()
+        self.shared.close()
+        if self.owner:
+            self.shared.unlink()
+        self.shared = None
+
+    @property
+    def generation(self) -> int:
+        return self.words[0]
+
+    @generation.setter
+    def generation(self, value: int) -> None:
+        self.words[0] = value & 0xff
+
+    def clear(self) -> None:
+        self.words[:] = memoryview(bytes(len(self.words) * 8)).cast('Q')
+        self.reset_stats()
+
+    def _read(self, offset: int) -> Union[tuple, None]:
+        words = self.words
+        check, data, score_bits = words[offset], words[offset + 1], words[offset + 2]
+        if not data:
+            return None
+        move = data & 0xffff
+        return (check ^ data ^ score_bits,
+                data >> self._depth_shift & 0xff,
+                struct.unpack('<d', struct.pack('<Q', score_bits))[0],
+                data >> self._bound_shift & 0x3,
+                move or None,
+                data >> self._generation_shift & 0xff)
+
+    def probe(self, key: int) -> Union[tuple, None]:
+        offset = 1 + (key % self.buckets) * 6
+        for entry in (self._read(offset), self._read(offset + 3)):
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, move: Union[int, None]) -> None:
+        offset = 1 + (key % self.buckets) * 6
+        generation = self.generation
+        current = self._read(offset)
+        if current is not None and current[0] != key and current[1] > depth and current[5] == generation:
+            offset += 3
+            current = self._read(offset)
+        if current is not None and current[0] != key:
+            self.overwrites += 1
+
+        # Empty data word marks an empty slot, so it is never zero for a stored entry
+        data = (move or 0) | max(depth, 0) << self._depth_shift | bound << self._bound_shift \
+            | generation << self._generation_shift | 1 << 63
+        score_bits = struct.unpack('<Q', struct.pack('<d', score))[0]
+        words = self.words
+        words[offset] = key ^ data ^ score_bits
+        words[offset + 1] = data
+        words[offset + 2] = score_bits
+        self.stores += 1
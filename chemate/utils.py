@@ -35,7 +35,7 @@ class FENExporter(BoardExporter):
                f"{'Q' if self.rook_avail(Player.WHITE, True) else '-'}" \
                f"{'k' if self.rook_avail(Player.BLACK, False) else '-'}" \
                f"{'q' if self.rook_avail(Player.BLACK, True) else '-'}" \
-               f" - 0 {self.board.move_number}"
+               f" {self.board.passthrough_square() or '-'} 0 {self.board.move_number}"
 
     def rook_avail(self, color: int, long: bool) -> bool:
         king = self.board.figure_at(Position.from_xy(4, 0 if color == Player.WHITE else 7))
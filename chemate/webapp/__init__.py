@@ -11,6 +11,25 @@ def create_app() -> Flask:
     app.config['API_TITLE'] = 'Chemate'
     app.config['API_VERSION'] = '0.0.1'
     app.config['OPENAPI_VERSION'] = '3.0.2'
+    # Worker processes of the search pool, all CPUs when not set
+    app.config['SEARCH_WORKERS'] = int(os.environ.get('SEARCH_WORKERS', 0)) or None
+    # Lazy SMP instead of splitting root moves between workers
+    app.config['SEARCH_LAZY_SMP'] = os.environ.get('SEARCH_LAZY_SMP', '0') == '1'
+    # Games kept on the server: least recently used ones above the limit and idle ones after the timeout are dropped
+    app.config['GAME_SESSIONS'] = int(os.environ.get('GAME_SESSIONS', 1024))
+    app.config['GAME_SESSION_TIMEOUT'] = float(os.environ.get('GAME_SESSION_TIMEOUT', 3600))
+    # Positions with cached valid moves and the max-age of their responses for upstream caches, seconds
+    app.config['POSITION_CACHE'] = int(os.environ.get('POSITION_CACHE', 4096))
+    app.config['POSITION_CACHE_MAX_AGE'] = int(os.environ.get('POSITION_CACHE_MAX_AGE', 86400))
+    # Tasks file, loaded once by the first task request
+    app.config['TASKS_FILE'] = os.environ.get('TASKS_FILE', 'chemate/webapp/resources/m3hv01.json')
+    # Analysis jobs: searches run at once, searches waiting before new ones are refused with 429,
+    # seconds a refused client should wait, time (seconds) and node budgets of one search
+    app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', 1))
+    app.config['ANALYSIS_QUEUE'] = int(os.environ.get('ANALYSIS_QUEUE', 32))
+    app.config['ANALYSIS_RETRY_AFTER'] = int(os.environ.get('ANALYSIS_RETRY_AFTER', 5))
+    app.config['ANALYSIS_MAX_TIME'] = float(os.environ.get('ANALYSIS_MAX_TIME', 10))
+    app.config['ANALYSIS_MAX_NODES'] = int(os.environ.get('ANALYSIS_MAX_NODES', 0)) or None
 
     restapi = flask_smorest.Api(app)
     restapi.register_blueprint(game.blueprint)
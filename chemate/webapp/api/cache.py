@@ -0,0 +1,59 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+
+class PositionCache(object):
+    """
+    Responses of positions by key (FEN), the least recently used ones are dropped above capacity.
+    Every entry keeps the ETag of its response
+    """
+    def __init__(self, capacity: int = 4096) -> None:
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, compute: Callable[[], dict]) -> tuple[dict, str]:
+        """
+        Cached response of the position, computed outside the lock when missing.
+        The response is shared by all requests and must not be changed
+        :return: response and its ETag
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry
+            self.misses += 1
+        response = compute()
+        entry = response, hashlib.sha1(json.dumps(response, sort_keys=True).encode()).hexdigest()
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+        pass
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {'size': len(self.entries), 'capacity': self.capacity, 'hits': self.hits,
+                    'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def __len__(self) -> int:
+        return len(self.entries)
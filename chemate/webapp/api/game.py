@@ -1,50 +1,205 @@
-import json
-import random
+import atexit
+import threading
 
 import flask
 from flask.views import MethodView
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
 
 from chemate.board import Board
-from chemate.decision import DecisionTree
+from chemate.pool import SearchPool
 from chemate.positions import InitialPosition, PredefinedFENPosition
 from chemate.utils import FENExporter
+from chemate.webapp.api.cache import PositionCache
+from chemate.webapp.api.jobs import AnalysisJob, JobScheduler, QueueFull
+from chemate.webapp.api.schemas import BoardSchema, BoardSearchSchema, SearchSchema
+from chemate.webapp.api.sessions import SessionStore, GameSession
+from chemate.webapp.api.tasks import TaskStore
 
 blueprint = Blueprint('items', __name__)
 
+_pool_lock = threading.Lock()
+_tasks_lock = threading.Lock()
+
+
+def search_pool() -> SearchPool:
+    """
+    Search pool of the application, started with the first search and shared by all requests
+    """
+    app = flask.current_app
+    with _pool_lock:
+        pool = app.extensions.get('search_pool')
+        if pool is None:
+            pool = app.extensions['search_pool'] = SearchPool(app.config.get('SEARCH_WORKERS'))
+            atexit.register(pool.close)
+    return pool
+
+
+def job_scheduler() -> JobScheduler:
+    """
+    Analysis jobs of the application, run with the search pool
+    """
+    app = flask.current_app
+    scheduler = app.extensions.get('job_scheduler')
+    if scheduler is not None:
+        return scheduler
+    pool = search_pool()
+    with _pool_lock:
+        scheduler = app.extensions.get('job_scheduler')
+        if scheduler is None:
+            config = app.config
+            scheduler = app.extensions['job_scheduler'] = JobScheduler(
+                pool, config['SEARCH_LAZY_SMP'], config['ANALYSIS_WORKERS'], config['ANALYSIS_QUEUE'],
+                config['ANALYSIS_MAX_TIME'], config['ANALYSIS_MAX_NODES'])
+            atexit.register(scheduler.close)
+    return scheduler
+
+
+def submit_job(fen: str, depth: int = None, time_limit: float = None, node_limit: int = None,
+               variety: float = 0.0, seed: int = None) -> AnalysisJob:
+    """
+    Queue the search with the job scheduler, 429 when too many searches are waiting
+    """
+    try:
+        return job_scheduler().submit(fen, depth, time_limit, node_limit, variety, seed)
+    except QueueFull as e:
+        abort(429, message=str(e), headers={'Retry-After': str(flask.current_app.config['ANALYSIS_RETRY_AFTER'])})
+
+
+def engine_move(fen: str, options: dict) -> AnalysisJob:
+    """
+    Search the engine move with the job scheduler and wait for it, budgets are limited as for analysis jobs
+    """
+    job = submit_job(fen, 3, options['time_limit'], None, options['variety'], options['seed'])
+    job.finished.wait()
+    if job.status != AnalysisJob.DONE:
+        abort(503, message=job.error or f'Search {job.status}')
+    if job.code is None:
+        abort(422, message='No moves')
+    return job
+
+
+def position_cache() -> PositionCache:
+    """
+    Responses of positions served by the application
+    """
+    app = flask.current_app
+    with _pool_lock:
+        cache = app.extensions.get('position_cache')
+        if cache is None:
+            cache = app.extensions['position_cache'] = PositionCache(app.config['POSITION_CACHE'])
+    return cache
+
+
+def board_state(board: Board) -> dict:
+    return {'board': board.export(FENExporter),
+            'balance': board.balance,
+            'valid_moves': list(map(lambda m: [str(m.from_pos), str(m.to_pos), str(m)],
+                                    board.valid_moves(board.current)))
+            }
+
+
+def fen_state(fen: str) -> dict:
+    board = Board()
+    board.init(PredefinedFENPosition(fen))
+    return board_state(board)
+
+
+def position_state(fen: str) -> tuple[dict, str]:
+    """
+    Cached state of the position given by FEN
+    :return: state and its ETag
+    """
+    return position_cache().get(fen, lambda: fen_state(fen))
+
+
+def cached_response(state: dict, etag: str):
+    """
+    Response of a deterministic endpoint that upstream caches may keep, not modified when the ETag matches
+    """
+    headers = {'ETag': f'"{etag}"',
+               'Cache-Control': f'public, max-age={flask.current_app.config["POSITION_CACHE_MAX_AGE"]}'}
+    if flask.request.method in ('GET', 'HEAD') and flask.request.if_none_match.contains(etag):
+        return flask.Response(status=304, headers=headers)
+    return state, 200, headers
+
+
+def task_store() -> TaskStore:
+    """
+    Tasks of the application, loaded with the first task request
+    """
+    app = flask.current_app
+    with _tasks_lock:
+        store = app.extensions.get('task_store')
+        if store is None:
+            store = app.extensions['task_store'] = TaskStore.load(app.config['TASKS_FILE'], fen_state)
+    return store
+
+
+def game_sessions() -> SessionStore:
+    """
+    Live games of the application, kept in this process
+    """
+    app = flask.current_app
+    with _pool_lock:
+        store = app.extensions.get('game_sessions')
+        if store is None:
+            store = app.extensions['game_sessions'] = SessionStore(app.config['GAME_SESSIONS'],
+                                                                   app.config['GAME_SESSION_TIMEOUT'])
+    return store
+
+
+def game_session(game_id) -> GameSession:
+    session = game_sessions().get(game_id)
+    if session is None:
+        abort(404, message='Game not found or expired')
+    return session
+
+
+def session_state(session: GameSession) -> dict:
+    board = session.board
+    return {'id': str(session.id),
+            'board': board.export(FENExporter),
+            'balance': board.balance,
+            'moves': [str(move) for move in board.moves],
+            'valid_moves': list(map(lambda m: [str(m.from_pos), str(m.to_pos), str(m)],
+                                    board.valid_moves(board.current)))
+            }
+
 
 @blueprint.route('/api/game/new')
 class GameNewApi(MethodView):
     @blueprint.response(200)
     def get(self):
-        board = Board()
-        board.init(InitialPosition())
-        return {'board': board.export(FENExporter),
-                'balance': board.balance,
-                'valid_moves': list(map(lambda m: [str(m.from_pos), str(m.to_pos), str(m)],
-                                        board.valid_moves(board.current)))
-                }
+        def compute() -> dict:
+            board = Board()
+            board.init(InitialPosition())
+            return board_state(board)
+
+        # The initial position is kept under the empty key, FEN keys are never empty
+        return cached_response(*position_cache().get('', compute))
 
 
 @blueprint.route('/api/game/tasks')
 class TasksApi(MethodView):
-    def __init__(self) -> None:
-        super().__init__()
-        with open('chemate/webapp/resources/m3hv01.json') as fp:
-            self.tasks = json.load(fp)
-
     @blueprint.response(200)
     def get(self):
-        board = Board()
+        """
+        Random task, of the theme and difficulty when given by query parameters
+        """
+        task = task_store().choice(flask.request.args.get('theme'), flask.request.args.get('difficulty'))
+        if task is None:
+            abort(404, message='No tasks found')
+        return task.as_dict()
 
-        task = random.choice(self.tasks)
-        board.init(PredefinedFENPosition(task.get('response').get('fen')))
 
-        return {'board': board.export(FENExporter),
-                'balance': board.balance,
-                'valid_moves': list(map(lambda m: [str(m.from_pos), str(m.to_pos), str(m)],
-                                        board.valid_moves(board.current)))
-                }
+@blueprint.route('/api/game/tasks/<int:task_id>')
+class TaskApi(MethodView):
+    @blueprint.response(200)
+    def get(self, task_id):
+        task = task_store().get(task_id)
+        if task is None:
+            abort(404, message='Task not found')
+        return task.as_dict()
 
 
 @blueprint.route('/api/game/move')
@@ -69,33 +224,155 @@ class GameMoveApi(MethodView):
 
 @blueprint.route('/api/game/moves')
 class GameMovesApi(MethodView):
+    @blueprint.arguments(BoardSchema, location='query')
     @blueprint.response(200)
-    def post(self):
-        board = Board()
-        board.init(PredefinedFENPosition(flask.request.json.get("board")))
-        return {'board': board.export(FENExporter),
-                'balance': board.balance,
-                'valid_moves': list(map(lambda m: [str(m.from_pos), str(m.to_pos), str(m)],
-                                        board.valid_moves(board.current)))
-                }
+    def get(self, args):
+        """
+        Valid moves of the board given as FEN by the board query parameter, may be kept by upstream caches
+        """
+        return cached_response(*position_state(args['board']))
+
+    @blueprint.arguments(BoardSchema)
+    @blueprint.response(200)
+    def post(self, args):
+        return cached_response(*position_state(args['board']))
 
 
 @blueprint.route('/api/game/calc')
 class BoardCalcApi(MethodView):
+    @blueprint.arguments(BoardSearchSchema)
     @blueprint.response(200)
-    def post(self):
+    def post(self, args):
+        job = engine_move(args['board'], args)
         board = Board()
-        board.init(PredefinedFENPosition(flask.request.json.get("board")))
-
-        decision = DecisionTree(4)
-        move, score, variants = decision.best_move(board)
+        board.init(PredefinedFENPosition(args['board']))
+        move = board.movement(job.code)
         board.move(move)
 
         return {'move': str(move),
                 'board': board.export(FENExporter),
                 'balance': board.balance,
-                'score': score,
-                'variants': variants,
+                'score': job.result['score'],
+                'variants': job.result['variants'],
+                'stats': job.result['stats'],
                 'valid_moves': list(map(lambda m: [str(m.from_pos), str(m.to_pos), str(m)],
                                         board.valid_moves(board.current)))
                 }
+
+
+@blueprint.route('/api/game/sessions')
+class GameSessionsApi(MethodView):
+    @blueprint.response(201)
+    def post(self):
+        """
+        Start a game kept on the server, from the initial position or from the board given as FEN
+        """
+        board = Board()
+        fen = (flask.request.get_json(silent=True) or {}).get('board')
+        board.init(PredefinedFENPosition(fen) if fen else InitialPosition())
+        session = game_sessions().create(board)
+        with session.lock:
+            return session_state(session)
+
+
+@blueprint.route('/api/game/<uuid:game_id>')
+class GameSessionApi(MethodView):
+    @blueprint.response(200)
+    def get(self, game_id):
+        session = game_session(game_id)
+        with session.lock:
+            return session_state(session)
+
+    @blueprint.response(204)
+    def delete(self, game_id):
+        if not game_sessions().remove(game_id):
+            abort(404, message='Game not found or expired')
+
+
+@blueprint.route('/api/game/<uuid:game_id>/move')
+class GameSessionMoveApi(MethodView):
+    @blueprint.response(200)
+    def post(self, game_id):
+        """
+        Make the move [from, to] or [from, to, promotion figure] on the game board
+        """
+        session = game_session(game_id)
+        m = flask.request.json.get('move')
+        with session.lock:
+            board = session.board
+            for move in board.valid_moves(board.current):
+                if str(move.from_pos) == m[0] and str(move.to_pos) == m[1] \
+                        and (len(m) < 3 or move.transform_to is None or move.transform_to._char == m[2].lower()):
+                    board.move(move)
+                    break
+            else:
+                abort(422, message='Invalid move')
+            return session_state(session)
+
+
+@blueprint.route('/api/game/<uuid:game_id>/rollback')
+class GameSessionRollbackApi(MethodView):
+    @blueprint.response(200)
+    def post(self, game_id):
+        session = game_session(game_id)
+        with session.lock:
+            session.board.rollback()
+            return session_state(session)
+
+
+@blueprint.route('/api/game/<uuid:game_id>/calc')
+class GameSessionCalcApi(MethodView):
+    @blueprint.arguments(SearchSchema)
+    @blueprint.response(200)
+    def post(self, args, game_id):
+        """
+        Find and make the engine move on the game board
+        """
+        session = game_session(game_id)
+        with session.lock:
+            board = session.board
+            job = engine_move(board.export(FENExporter), args)
+            move = board.movement(job.code)
+            board.move(move)
+            return dict(session_state(session), move=str(move), score=job.result['score'],
+                        variants=job.result['variants'], stats=job.result['stats'])
+
+
+@blueprint.route('/api/game/cache')
+class PositionCacheApi(MethodView):
+    @blueprint.response(200)
+    def get(self):
+        """
+        Size and hit rate of the position cache
+        """
+        return position_cache().as_dict()
+
+
+@blueprint.route('/api/game/analysis')
+class AnalysisJobsApi(MethodView):
+    @blueprint.response(202)
+    def post(self):
+        """
+        Queue the search of the board given as FEN with optional depth, time_limit and node_limit.
+        The same search queued or running is shared, 429 when too many searches are waiting
+        """
+        options = flask.request.json
+        return submit_job(options.get('board'), options.get('depth'), options.get('time_limit'),
+                          options.get('node_limit')).as_dict()
+
+
+@blueprint.route('/api/game/analysis/<uuid:job_id>')
+class AnalysisJobApi(MethodView):
+    @blueprint.response(200)
+    def get(self, job_id):
+        job = job_scheduler().get(job_id)
+        if job is None:
+            abort(404, message='Job not found')
+        return job.as_dict()
+
+    @blueprint.response(200)
+    def delete(self, job_id):
+        job = job_scheduler().cancel(job_id)
+        if job is None:
+            abort(404, message='Job not found')
+        return job.as_dict()
@@ -0,0 +1,199 @@
+import threading
+import uuid
+from collections import deque
+from typing import Union
+
+from chemate.board import Board
+from chemate.decision import DecisionTree
+from chemate.pool import SearchPool, SearchToken
+from chemate.positions import PredefinedFENPosition
+
+
+class QueueFull(Exception):
+    pass
+
+
+class AnalysisJob(object):
+    """
+    Search of one position. Identical requests made while the job is queued or running share it,
+    searches with variety and no seed are never shared
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+    FAILED = 'failed'
+
+    def __init__(self, fen: str, depth: int, time_limit: float, node_limit: Union[int, None],
+                 variety: float = 0.0, seed: int = None) -> None:
+        self.id = uuid.uuid4()
+        self.fen = fen
+        self.depth = depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.variety = variety
+        self.seed = seed
+        self.status = self.QUEUED
+        self.result = None
+        self.error = None
+        # Code of the move found, for callers making it on their board
+        self.code = None
+        # Requests waiting for the job, it is cancelled when all of them cancel
+        self.waiters = 1
+        # Cancelling the token stops the search, also when it is cancelled before the search starts
+        self.token = SearchToken()
+        self.decision = None
+        self.finished = threading.Event()
+
+    @property
+    def key(self) -> tuple:
+        key = self.fen, self.depth, self.time_limit, self.node_limit, self.variety, self.seed
+        return key + (self.id,) if self.variety and self.seed is None else key
+
+    def as_dict(self) -> dict:
+        return {'id': str(self.id), 'board': self.fen, 'depth': self.depth, 'time_limit': self.time_limit,
+                'node_limit': self.node_limit, 'variety': self.variety, 'seed': self.seed, 'status': self.status,
+                'result': self.result, 'error': self.error}
+
+
+class JobScheduler(object):
+    """
+    Analysis jobs of the server run by a fixed number of threads sharing the search pool.
+    Submissions above the queue size are refused, budgets of the jobs are limited by max_time and max_nodes
+    """
+    def __init__(self, pool: SearchPool = None, lazy_smp: bool = False, concurrency: int = 1, queue_size: int = 32,
+                 max_time: float = 10.0, max_nodes: int = None, max_depth: int = 8, history: int = 1024) -> None:
+        self.pool = pool
+        self.lazy_smp = lazy_smp
+        self.queue_size = queue_size
+        self.max_time = max_time
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.history = history
+        self.queue = deque()
+        # Queued and running jobs by key, all kept jobs by id and ids of finished ones in order of completion
+        self.active = {}
+        self.jobs = {}
+        self.done = deque()
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.closed = False
+        self.threads = [threading.Thread(target=self.work, name=f'analysis-{index}', daemon=True)
+                        for index in range(concurrency)]
+        for thread in self.threads:
+            thread.start()
+        pass
+
+    def submit(self, fen: str, depth: int = None, time_limit: float = None, node_limit: int = None,
+               variety: float = 0.0, seed: int = None) -> AnalysisJob:
+        """
+        Queue the search of the position, or join the identical job queued or running
+        :raise QueueFull: when the queue is full
+        """
+        depth = min(depth or self.max_depth, self.max_depth)
+        time_limit = min(time_limit or self.max_time, self.max_time)
+        if self.max_nodes is not None:
+            node_limit = min(node_limit or self.max_nodes, self.max_nodes)
+        job = AnalysisJob(fen, depth, time_limit, node_limit, variety, seed)
+        with self.lock:
+            if self.closed:
+                raise QueueFull('Scheduler is closed')
+            active = self.active.get(job.key)
+            if active is not None:
+                active.waiters += 1
+                return active
+            if len(self.queue) >= self.queue_size:
+                raise QueueFull(f'{len(self.queue)} jobs are waiting')
+            self.active[job.key] = self.jobs[job.id] = job
+            self.queue.append(job)
+            self.ready.notify()
+        return job
+
+    def get(self, job_id: uuid.UUID) -> Union[AnalysisJob, None]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: uuid.UUID) -> Union[AnalysisJob, None]:
+        """
+        Withdraw one request of the job, the job is cancelled when no request waits for it
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished.is_set():
+                return job
+            job.waiters -= 1
+            if job.waiters > 0:
+                return job
+            if job.status == AnalysisJob.QUEUED:
+                self.queue.remove(job)
+                self.finish(job, AnalysisJob.CANCELLED)
+            else:
+                job.status = AnalysisJob.CANCELLED
+                job.token.cancel()
+                if job.decision is not None:
+                    job.decision.cancel()
+        return job
+
+    def work(self) -> None:
+        while True:
+            with self.lock:
+                while not self.queue and not self.closed:
+                    self.ready.wait()
+                if self.closed:
+                    return
+                job = self.queue.popleft()
+                job.status = AnalysisJob.RUNNING
+                job.decision = DecisionTree(3, pool=self.pool, lazy_smp=self.lazy_smp, variety=job.variety,
+                                            seed=job.seed)
+
+            status, result, error = AnalysisJob.DONE, None, None
+            try:
+                result = self.run(job)
+            except Exception as e:
+                status, error = AnalysisJob.FAILED, str(e)
+            with self.lock:
+                # Results of the iterations completed before the cancel are kept
+                self.finish(job, AnalysisJob.CANCELLED if job.status == AnalysisJob.CANCELLED else status,
+                            result, error)
+        pass
+
+    def run(self, job: AnalysisJob) -> dict:
+        board = Board()
+        board.init(PredefinedFENPosition(job.fen))
+        decision = job.decision
+        move, score, variants = decision.best_move(board, depth=job.depth, time_limit=job.time_limit,
+                                                   node_limit=job.node_limit, token=job.token)
+        if move is not None:
+            job.code = move.code
+        return {'move': None if move is None else str(move),
+                'score': score,
+                'variants': variants,
+                'stats': decision.stats.as_dict()}
+
+    def finish(self, job: AnalysisJob, status: str, result: dict = None, error: str = None) -> None:
+        """
+        Complete the job and drop the oldest finished jobs above history, the lock must be held
+        """
+        job.status, job.result, job.error, job.decision = status, result, error, None
+        if self.active.get(job.key) is job:
+            del self.active[job.key]
+        job.finished.set()
+        self.done.append(job.id)
+        while len(self.done) > self.history:
+            del self.jobs[self.done.popleft()]
+        pass
+
+    def close(self) -> None:
+        """
+        Stop the threads, running searches are cancelled and queued jobs dropped
+        """
+        with self.lock:
+            self.closed = True
+            for job in self.active.values():
+                job.token.cancel()
+                if job.decision is not None:
+                    job.decision.cancel()
+            self.ready.notify_all()
+        for thread in self.threads:
+            thread.join()
+        pass
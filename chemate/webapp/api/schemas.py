@@ -0,0 +1,23 @@
+from marshmallow import Schema, EXCLUDE, fields, validate
+
+
+class BoardSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    # Board as FEN
+    board = fields.String(required=True, validate=validate.Length(min=1))
+
+
+class SearchSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    # Width of the noise added to estimates, seed of the noise, seconds of the search
+    variety = fields.Float(load_default=0.0, validate=validate.Range(min=0))
+    seed = fields.Integer(load_default=None, allow_none=True)
+    time_limit = fields.Float(load_default=None, allow_none=True, validate=validate.Range(min=0, min_inclusive=False))
+
+
+class BoardSearchSchema(BoardSchema, SearchSchema):
+    pass
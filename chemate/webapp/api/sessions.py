@@ -0,0 +1,69 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Union
+
+from chemate.board import Board
+
+
+class GameSession(object):
+    """
+    Live board of one game, moves are applied to it and taken back with the whole history kept
+    """
+    def __init__(self, board: Board) -> None:
+        self.id = uuid.uuid4()
+        self.board = board
+        # Requests of the same game are served one by one
+        self.lock = threading.Lock()
+        self.used = 0.0
+
+
+class SessionStore(object):
+    """
+    Game sessions by id kept in this process. Above capacity the least recently used sessions are dropped,
+    sessions not used for timeout seconds are dropped as well
+    """
+    def __init__(self, capacity: int = 1024, timeout: float = 3600,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.capacity = capacity
+        self.timeout = timeout
+        self.clock = clock
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def create(self, board: Board) -> GameSession:
+        session = GameSession(board)
+        with self.lock:
+            session.used = self.clock()
+            self.sessions[session.id] = session
+            self.evict(session.used)
+        return session
+
+    def get(self, session_id: uuid.UUID) -> Union[GameSession, None]:
+        with self.lock:
+            now = self.clock()
+            self.evict(now)
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.used = now
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: uuid.UUID) -> bool:
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def evict(self, now: float) -> None:
+        """
+        Drop idle sessions and the least recently used ones above capacity, the lock must be held
+        """
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if len(self.sessions) <= self.capacity and now - session.used < self.timeout:
+                break
+            del self.sessions[session.id]
+        pass
+
+    def __len__(self) -> int:
+        return len(self.sessions)
@@ -0,0 +1,71 @@
+import json
+import os
+import random
+from typing import Callable, Union
+
+
+class Task(object):
+    """
+    Position of a task with the state served for it prepared in advance
+    """
+    __slots__ = ['id', 'fen', 'theme', 'difficulty', 'solution', 'state']
+
+    def __init__(self, id: int, fen: str, theme: Union[str, None], difficulty: Union[str, None],
+                 solution: list, state: dict) -> None:
+        self.id = id
+        self.fen = fen
+        self.theme = theme
+        self.difficulty = difficulty
+        self.solution = solution
+        self.state = state
+
+    def as_dict(self) -> dict:
+        return dict(self.state, task={'id': self.id, 'theme': self.theme, 'difficulty': self.difficulty,
+                                      'solution': self.solution})
+
+
+class TaskStore(object):
+    """
+    Tasks loaded once, indexed by theme, by difficulty and by both for random selection in constant time
+    """
+    def __init__(self, tasks: list[dict], describe: Callable[[str], dict]) -> None:
+        """
+        :param tasks: tasks as stored in the tasks file, fields are read from the response of the task
+        :param describe: state served for the position given by FEN
+        """
+        self.tasks = []
+        self.index = {}
+        for data in tasks:
+            response = dict(data, **data.get('response', {}))
+            fen = response['fen']
+            theme, difficulty = response.get('theme'), response.get('difficulty')
+            task = Task(len(self.tasks), fen, None if theme is None else str(theme),
+                        None if difficulty is None else str(difficulty), list(response.get('solution', [])),
+                        describe(fen))
+            self.tasks.append(task)
+            for key in ((None, None), (task.theme, None), (None, task.difficulty), (task.theme, task.difficulty)):
+                self.index.setdefault(key, []).append(task)
+        pass
+
+    @classmethod
+    def load(cls, path: str, describe: Callable[[str], dict]) -> 'TaskStore':
+        """
+        Tasks of the JSON file, no tasks when there is no file
+        """
+        if not os.path.exists(path):
+            return cls([], describe)
+        with open(path) as fp:
+            return cls(json.load(fp), describe)
+
+    def get(self, task_id: int) -> Union[Task, None]:
+        return self.tasks[task_id] if 0 <= task_id < len(self.tasks) else None
+
+    def choice(self, theme: str = None, difficulty: str = None) -> Union[Task, None]:
+        """
+        Random task of the theme and difficulty, any when not given
+        """
+        tasks = self.index.get((theme, difficulty))
+        return random.choice(tasks) if tasks else None
+
+    def __len__(self) -> int:
+        return len(self.tasks)
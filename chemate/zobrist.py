@@ -0,0 +1,18 @@
+import random
+
+from chemate.core import Figure
+
+# Keys are generated from a fixed seed, so every process computes the same hash for a position
+_random = random.Random(0x636865)
+
+FIGURE_KEYS = {char: tuple(_random.getrandbits(64) for index in range(64)) for char in "KQRBNPkqrbnp"}
+SIDE_KEY = _random.getrandbits(64)
+ROOKING_KEYS = tuple(_random.getrandbits(64) for rights in range(16))
+PASSTHROUGH_KEYS = tuple(_random.getrandbits(64) for x in range(8))
+
+# Rooking rights bits
+WHITE_SHORT, WHITE_LONG, BLACK_SHORT, BLACK_LONG = 1, 2, 4, 8
+
+
+def figure_key(figure: Figure, index: int) -> int:
+    return FIGURE_KEYS[figure.char][index]
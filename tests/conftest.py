@@ -0,0 +1,35 @@
+import pytest
+
+from chemate.decision import DecisionTree
+from chemate.webapp import create_app
+
+
+def create_exact_decision_tree(pool=None, probe: bool = False) -> DecisionTree:
+    """
+    Search without selective parts and, unless probe is set, without table cutoffs,
+    so scores don't depend on the window
+    """
+    decision = DecisionTree(3, pool=pool)
+    decision.null_move = decision.late_move_reductions = False
+    decision.futility_pruning = decision.razoring = False
+    if not probe:
+        decision.table.probe = lambda key: None
+    return decision
+
+
+@pytest.fixture
+def exact_decision_tree():
+    return create_exact_decision_tree
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield client
@@ -0,0 +1,34 @@
+import json
+
+from chemate.bench import POSITIONS, run, compare, main
+
+
+class TestBench(object):
+    def test_run(self):
+        results = run({'endgame': POSITIONS['endgame']}, 2)
+        result = results['positions']['endgame']
+        assert result['depth'] == 2 and result['nodes'] > 0 and result['move']
+        assert results['total']['nodes'] == result['nodes']
+        assert json.loads(json.dumps(results)) == results
+
+        limited = run({'endgame': POSITIONS['endgame']}, 8, node_limit=500)
+        assert limited['node_limit'] == 500 and limited['positions']['endgame']['depth'] < 8
+
+    def test_compare(self):
+        results = run({'endgame': POSITIONS['endgame']}, 2)
+        assert compare(results, results, 0.1) == []
+
+        faster = json.loads(json.dumps(results))
+        faster['positions']['endgame']['nps'] *= 2
+        faster['positions']['endgame']['time'] /= 2
+        failures = compare(results, faster, 0.1)
+        assert [failure.split(':')[0] for failure in failures] == ['endgame', 'total']
+        assert compare(results, faster, 0.6) == []
+
+    def test_main(self, tmp_path, capsys):
+        output = tmp_path / 'bench.json'
+        assert main(['endgame', '-d', '2', '-o', str(output), '--profile']) == 0
+        out = capsys.readouterr().out
+        assert 'endgame:' in out and 'tottime' in out
+        assert main(['endgame', '-d', '2', '-b', str(output), '--threshold', '0.99']) == 0
+        assert json.loads(output.read_text())['depth'] == 2
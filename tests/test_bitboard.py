@@ -0,0 +1,70 @@
+from chemate.bitboard import BitBoard
+from chemate.board import Board
+from chemate.core import Player, Position
+from chemate.figures import King, Rook, Bishop
+from chemate.positions import EmptyPosition, InitialPosition, PredefinedFENPosition
+
+
+POSITIONS = [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+    '7n/P5P1/8/8/8/8/p5p1/7N w - - 0 1',
+    '7k/8/8/p1Q5/3b4/7P/6P1/2r3K1 w - - 0 1',
+]
+
+
+def move_set(board, color):
+    return sorted(str(m) + str(m.transform_to or '') for m in board.valid_moves(color))
+
+
+class TestBitBoard(object):
+    def test_same_moves_as_board(self):
+        for fen in POSITIONS:
+            board, bitboard = Board(), BitBoard()
+            board.init(PredefinedFENPosition(fen))
+            bitboard.init(PredefinedFENPosition(fen))
+            for color in (Player.WHITE, Player.BLACK):
+                assert move_set(board, color) == move_set(bitboard, color), fen
+
+    def test_same_moves_after_each_move(self):
+        board, bitboard = Board(), BitBoard()
+        board.init(PredefinedFENPosition(POSITIONS[1]))
+        bitboard.init(PredefinedFENPosition(POSITIONS[1]))
+        for move in list(bitboard.valid_moves(bitboard.current)):
+            bitboard.move(move)
+            board.move(next(m for m in board.valid_moves(board.current)
+                            if m.from_pos == move.from_pos and m.to_pos == move.to_pos))
+            assert move_set(board, board.current) == move_set(bitboard, bitboard.current), str(move)
+            board.rollback()
+            bitboard.rollback()
+
+    def test_rollback_restores_bits(self):
+        board = BitBoard()
+        board.init(InitialPosition())
+        bits = {color: dict(kinds) for color, kinds in board.bits.items()}
+        for move in list(board.valid_moves(Player.WHITE)):
+            board.move(move)
+            for reply in list(board.valid_moves(Player.BLACK)):
+                board.move(reply)
+                board.rollback()
+            board.rollback()
+        assert board.bits == bits
+
+    def test_is_attacked(self):
+        board = BitBoard()
+        board.init(EmptyPosition())
+        board.put_figures([King(Player.WHITE, Position.from_char('e1')),
+                           Rook(Player.BLACK, Position.from_char('e8')),
+                           Bishop(Player.WHITE, Position.from_char('e4'))])
+        assert not board.test_for_check(Player.WHITE)
+        assert board.is_attacked(Player.WHITE, Position.from_char('e5'))
+        assert not board.is_attacked(Player.WHITE, Position.from_char('e3'))
+
+    def test_passthrough(self):
+        board = BitBoard()
+        board.init(PredefinedFENPosition('4k3/8/8/8/5p2/8/4P3/4K3 w - - 0 1'))
+        board.move(next(m for m in board.valid_moves(Player.WHITE) if str(m) == 'e2-e4'))
+        moves = list(map(str, board.valid_moves(Player.BLACK)))
+        assert 'f4xe3' in moves
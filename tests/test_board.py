@@ -1,5 +1,7 @@
+import pickle
+
 from chemate.board import Board
-from chemate.core import Movement
+from chemate.core import Movement, MoveCode
 from chemate.positions import EmptyPosition, InitialPosition, PredefinedFENPosition
 from chemate.figures import *
 from chemate.utils import PlainExporter
@@ -157,3 +159,109 @@ class TestBoard(object):
         board.rollback()
         assert board.figure_at(Position.from_char('b8')) is not None
         assert board.figure_at(Position.from_char('c6')) is not None
+
+    def test_pinned_figure(self):
+        board = Board()
+        board.init(PredefinedFENPosition('4r2k/8/8/8/8/4B3/8/4K3'))
+        safety = board.king_safety(Player.WHITE)
+        assert safety.checkers == [] and safety.evasions is None
+        assert Position.from_char('e3').index in safety.pins
+
+        bishop = board.figure_at(Position.from_char('e3'))
+        assert list(board.figure_moves(bishop)) == []
+
+    def test_double_check(self):
+        board = Board()
+        board.init(PredefinedFENPosition('4r2k/8/8/8/8/3n4/3R4/4K3'))
+        safety = board.king_safety(Player.WHITE)
+        assert len(safety.checkers) == 2
+        moves = list(map(str, board.valid_moves(Player.WHITE)))
+        assert moves and all(move.startswith('K') for move in moves)
+
+    def test_pieces_index(self):
+        board = Board()
+        board.init(PredefinedFENPosition('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R'))
+        assert board.kings[Player.WHITE] is board.figure_at(Position.from_char('e1'))
+        assert board.kings[Player.BLACK] is board.figure_at(Position.from_char('e8'))
+
+        def index_matches():
+            for color in (Player.WHITE, Player.BLACK):
+                expected = {f.position.index: f for f in board.figures if f.color == color}
+                if board.pieces[color] != expected:
+                    return False
+                if any(index != figure.position.index for index, figure in board.pieces[color].items()):
+                    return False
+            return True
+
+        for move in list(board.valid_moves(Player.WHITE)):
+            board.move(move)
+            assert index_matches(), str(move)
+            for reply in list(board.valid_moves(Player.BLACK)):
+                board.move(reply)
+                assert index_matches(), str(reply)
+                board.rollback()
+            board.rollback()
+        assert index_matches()
+        assert len(board.pieces[Player.WHITE]) == 16 and len(board.pieces[Player.BLACK]) == 16
+
+    def test_null_move(self):
+        board = Board()
+        board.init(PredefinedFENPosition('4k3/8/8/8/5p2/8/4P3/4K3 w - - 0 1'))
+        board.move(next(m for m in board.valid_moves(Player.WHITE) if str(m) == 'e2-e4'))
+        key = board.hash
+        board.null_move()
+        assert board.current == Player.WHITE
+        assert board.passthrough_square() is None
+        assert board.hash == board.compute_hash()
+        board.rollback_null_move()
+        assert board.current == Player.BLACK and board.hash == key
+        assert 'f4xe3' in map(str, board.valid_moves(Player.BLACK))
+
+    def test_balance_of_position(self):
+        # Balance depends on the figures on the board only, not on the moves which led there
+        board = Board()
+        board.init(PredefinedFENPosition('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1'))
+        for code in board.legal_moves(Player.WHITE):
+            board.make(code)
+            for reply in board.legal_moves(Player.BLACK):
+                board.make(reply)
+                assert board.balance == sum(figure.price for figure in board.figures)
+                board.unmake()
+            board.unmake()
+        assert board.balance == sum(figure.price for figure in board.figures)
+
+    def test_pickled_move(self):
+        # Moves found by the engine come back from another process with copies of the figures
+        board = Board()
+        board.init(PredefinedFENPosition('4k3/8/8/8/8/8/8/4K2r w - - 0 1'))
+        move = next(m for m in board.valid_moves(Player.WHITE) if str(m) == 'Ke1-e2')
+        board.move(pickle.loads(pickle.dumps(move)))
+        assert board.kings[Player.WHITE].position == Position.from_char('e2')
+        board.move(next(m for m in board.valid_moves(Player.BLACK) if str(m) == 'rh1-h2'))
+        assert board.test_for_check(Player.WHITE)
+        assert not {'Ke2-d2', 'Ke2-f2'} & set(map(str, board.valid_moves(Player.WHITE)))
+
+    def test_move_codes(self):
+        board = Board()
+        board.init(PredefinedFENPosition('r3k3/1P6/8/3pP3/8/8/8/4K2R w Kq d6 0 1'))
+        codes = board.legal_moves(Player.WHITE)
+        moves = list(board.valid_moves(Player.WHITE))
+        # Testing moves reorders the pieces index, so the order of generated moves may change
+        assert sorted(move.code for move in moves) == sorted(codes)
+        assert sorted(str(board.movement(code)) for code in codes) == sorted(map(str, moves))
+
+        by_name = {str(move): move.code for move in moves}
+        assert by_name['e5xd6'] & MoveCode.PASSTHROUGH and by_name['e5xd6'] & MoveCode.CAPTURE
+        assert by_name['0-0'] & MoveCode.ROOKING
+        knight = next(move for move in moves if isinstance(move.transform_to, Knight) and move.taken_figure)
+        assert knight.code >> 12 & 7 == MoveCode.PROMOTIONS.index('n') and knight.code & MoveCode.CAPTURE
+
+        key = board.hash
+        plain = board.export(PlainExporter)
+        for code in codes:
+            board.make(code)
+            assert board.hash == board.compute_hash()
+            board.unmake()
+            assert board.hash == key
+        assert board.export(PlainExporter) == plain
+        assert len(board.pieces[Player.WHITE]) == 4 and board.passthrough_square() == Position.from_char('d6')
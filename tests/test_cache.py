@@ -0,0 +1,42 @@
+from chemate.webapp.api.cache import PositionCache
+
+
+class TestPositionCache(object):
+    def test_hits_and_eviction(self):
+        cache = PositionCache(capacity=2)
+        computed = []
+
+        def compute(key):
+            return lambda: computed.append(key) or {'key': key}
+
+        first, etag = cache.get('a', compute('a'))
+        assert cache.get('a', compute('a')) == (first, etag)
+        cache.get('b', compute('b'))
+        cache.get('c', compute('c'))
+        assert computed == ['a', 'b', 'c'] and len(cache) == 2
+        cache.get('a', compute('a'))
+        assert computed == ['a', 'b', 'c', 'a']
+        assert cache.as_dict() == {'size': 2, 'capacity': 2, 'hits': 1, 'misses': 4, 'hit_rate': 0.2}
+        assert cache.get('c', compute('c'))[1] != etag
+
+
+class TestCachedEndpoints(object):
+    def test_new_game_not_modified(self, client):
+        response = client.get('/api/game/new')
+        assert response.headers['Cache-Control'].startswith('public')
+        assert len(response.get_json()['valid_moves']) == 20
+        response = client.get('/api/game/new', headers={'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+        assert client.get('/api/game/cache').get_json()['hits'] == 1
+
+    def test_moves_by_query_and_body(self, client):
+        fen = '8/P6k/8/8/8/8/8/K7 w - - 0 1'
+        posted = client.post('/api/game/moves', json={'board': fen})
+        response = client.get('/api/game/moves', query_string={'board': fen})
+        assert response.get_json() == posted.get_json()
+        assert response.headers['ETag'] == posted.headers['ETag']
+        assert client.get('/api/game/moves').status_code == 422
+        # The initial position is cached under the empty key, an empty board is not served from it
+        client.get('/api/game/new')
+        assert client.post('/api/game/moves', json={'board': ''}).status_code == 422
+        assert client.post('/api/game/moves', json={}).status_code == 422
@@ -1,8 +1,14 @@
+import io
+import json
+import time
+
 from chemate.figures import *
-from chemate.positions import InitialPosition, EmptyPosition
+from chemate.positions import InitialPosition, EmptyPosition, PredefinedFENPosition
 from chemate.core import Position, Player
 from chemate.board import Board
+from chemate.bitboard import BitBoard
 from chemate.decision import DecisionTree
+from chemate.stats import SearchTracer, TreeDumpTracer
 import pytest
 
 
@@ -81,3 +87,249 @@ class TestDecision(object):
 
         print("0: (%.2f)" % decision.estimate())
         self.make_moves(board, decision, Player.BLACK, 1)
+
+
+class TestIterativeDeepening(object):
+    fen = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+
+    def test_node_limit(self):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        decision = DecisionTree(3)
+        move, score, variants = decision.best_move(board, node_limit=3000)
+        assert move is not None
+        assert decision.depth_reached >= 1
+        assert len(board.moves) == 0
+
+    def test_time_limit(self):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        decision = DecisionTree(3)
+        started = time.time()
+        move, score, variants = decision.best_move(board, time_limit=0.2)
+        assert move is not None
+        assert time.time() - started < 2
+        assert decision.depth_reached >= 1
+
+    def test_completed_depth(self):
+        board = Board()
+        board.init(PredefinedFENPosition('7k/8/8/8/8/8/6PP/6QK w - - 0 1'))
+        decision = DecisionTree(2)
+        move, score, variants = decision.best_move(board, depth=2, time_limit=60)
+        assert decision.depth_reached == 2
+
+
+class MaterialDecisionTree(DecisionTree):
+    def estimate(self) -> float:
+        return self.board.balance
+
+
+def plain_minimax(board, depth):
+    if depth == 0:
+        return board.current * board.balance
+    moves = list(board.valid_moves(board.current))
+    if not moves:
+        return -DecisionTree.mate_score if board.test_for_check(board.current) else 0
+    best = -DecisionTree.infinity
+    for move in moves:
+        board.move(move)
+        best = max(best, -plain_minimax(board, depth - 1))
+        board.rollback()
+    return best
+
+
+class TestAlphaBeta(object):
+    def test_same_score_as_minimax(self):
+        for fen in ('r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 2 3',
+                    '4k3/8/3q4/2P1r3/4N3/5b2/8/K6Q w - - 0 1',
+                    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 b - - 0 1'):
+            board = Board()
+            board.init(PredefinedFENPosition(fen))
+            decision = MaterialDecisionTree(2)
+            # Plain minimax stops at the horizon and searches every move
+            decision.quiescence = False
+            decision.null_move = decision.late_move_reductions = False
+            decision.futility_pruning = decision.razoring = False
+            decision.board = board
+            score = decision.negamax(2, -decision.infinity, decision.infinity, 0)
+            assert score == plain_minimax(board, 2) or abs(score) > decision.mate_score - 10, fen
+
+    def test_root_scores_as_full_window(self, exact_decision_tree):
+        for fen in ('8/R1p5/6k1/1P1pP3/1K3pP1/2r5/8/8 b - - 0 6',
+                    'r1b5/ppppk1pp/5r1n/nPb1Pq2/P1P1PpB1/2BQ1PP1/5N1P/RN2K2R b KQ-- - 0 19',
+                    'rnb1k2r/p2pnpp1/3b3p/4P3/pqp4P/3PP1KN/1PP1B1P1/1RBQ2R1 b --kq - 0 14'):
+            board = Board()
+            board.init(PredefinedFENPosition(fen))
+            move, score, variants = exact_decision_tree().best_move(board, depth=3)
+
+            decision = exact_decision_tree()
+            decision.board = board
+            scores = {str(board.movement(code)): decision.search_move(code, 3, -decision.infinity,
+                                                                      decision.infinity, 0)
+                      for code in board.legal_moves(board.current)}
+            assert board.current * score == max(scores.values()) == scores[str(move)], fen
+
+    def test_mate_in_one(self):
+        board = Board()
+        board.init(PredefinedFENPosition('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1'))
+        move, score, variants = MaterialDecisionTree(2).best_move(board)
+        assert str(move) == 'Rd1-d8'
+        assert score == DecisionTree.mate_score - 1
+
+    def test_black_score_is_for_white(self):
+        board = Board()
+        board.init(PredefinedFENPosition('3r2k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1'))
+        move, score, variants = MaterialDecisionTree(2).best_move(board)
+        assert str(move) == 'rd8-d1'
+        assert score == -DecisionTree.mate_score + 1
+
+
+class TestQuiescence(object):
+    # Queen takes e5 with check, but the pawn on d6 takes the queen back
+    fen = '7k/8/3p4/4p3/8/8/4Q3/7K w - - 0 1'
+
+    def test_horizon(self):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        decision = MaterialDecisionTree(1)
+        decision.quiescence = False
+        move, score, variants = decision.best_move(board)
+        assert str(move) == 'Qe2xe5'
+
+        decision = MaterialDecisionTree(1)
+        move, score, variants = decision.best_move(board)
+        assert str(move) != 'Qe2xe5'
+        assert decision.quiescence_variants > 0
+
+    def test_evasions(self):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        decision = MaterialDecisionTree(1)
+        decision.quiescence_evasions = True
+        decision.board = board
+        assert decision.negamax(1, -decision.infinity, decision.infinity, 0) == board.balance
+        assert len(board.moves) == 0
+
+
+    def test_delta_pruning_bound(self, exact_decision_tree):
+        # Captures skipped by delta pruning keep the bound of the node, so board kinds and tables agree
+        results = set()
+        for kind in (Board, BitBoard):
+            for probe in (True, False):
+                board = kind()
+                board.init(PredefinedFENPosition(TestSelectiveSearch.fen))
+                decision = exact_decision_tree(probe=probe)
+                move, score, variants = decision.best_move(board, depth=3)
+                results.add((str(move), score))
+        assert len(results) == 1
+
+
+class TestSelectiveSearch(object):
+    fen = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+
+    def test_pruning_saves_nodes(self):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        full = MaterialDecisionTree(4)
+        full.null_move = full.late_move_reductions = full.futility_pruning = full.razoring = False
+        full.best_move(board)
+        assert full.pruning == DecisionTree.new_pruning_stats()
+
+        # Order of generated moves changes after searching, so the same start position is used
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        selective = MaterialDecisionTree(4)
+        move, score, variants = selective.best_move(board)
+        assert variants < full.variants
+        assert selective.pruning['null_move'] > 0 and selective.pruning['reductions'] > 0
+        assert len(board.moves) == 0 and board.hash == board.compute_hash()
+
+    def test_no_null_move_in_pawn_ending(self):
+        board = Board()
+        board.init(PredefinedFENPosition('8/8/4k3/8/3PK3/8/8/8 w - - 0 1'))
+        decision = MaterialDecisionTree(4)
+        decision.board = board
+        assert not decision.null_move_allowed(Player.WHITE)
+        decision.best_move(board)
+        assert decision.pruning['null_move'] == 0
+
+
+class TestVariety(object):
+    fen = 'r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR b KQkq - 3 3'
+
+    def search(self, decision):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        move, score, variants = decision.best_move(board)
+        return str(move), score, variants
+
+    def test_deterministic_by_default(self):
+        assert self.search(DecisionTree(3)) == self.search(DecisionTree(3))
+
+    def test_seeded_variety(self):
+        assert self.search(DecisionTree(3, variety=1.0, seed=7)) == self.search(DecisionTree(3, variety=1.0, seed=7))
+
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        decision = DecisionTree(1, variety=1.0, seed=7)
+        decision.board = board
+        plain = DecisionTree(1)
+        plain.board = board
+        estimates = set()
+        for _ in range(5):
+            decision.best_move(board)
+            # Noise is a function of the position within a search
+            assert decision.estimate() == decision.estimate()
+            assert abs(decision.estimate() - plain.estimate()) <= 0.5
+            estimates.add(decision.estimate())
+        assert len(estimates) > 1
+
+
+class CountingTracer(SearchTracer):
+    def __init__(self):
+        self.entered = 0
+        self.plies = []
+
+    def enter(self, ply, move, depth, alpha, beta):
+        self.entered += 1
+        self.plies.append(ply)
+
+    def leave(self, ply, score):
+        assert self.plies.pop() == ply
+
+
+class TestSearchStats(object):
+    fen = 'r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 2 3'
+
+    def test_stats(self):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        decision = DecisionTree(3)
+        move, score, variants = decision.best_move(board, depth=3, node_limit=10 ** 6)
+        stats = decision.stats
+        assert stats.depth == 3 and len(stats.nodes_per_depth) == len(stats.time_per_depth) == 3
+        assert stats.nodes == variants == sum(stats.nodes_per_depth)
+        assert 0 < stats.quiescence_nodes < stats.nodes
+        assert 0 < stats.first_move_cutoffs <= stats.cutoffs and 0 < stats.first_move_cutoff_rate <= 1
+        assert stats.branching_factor == stats.nodes_per_depth[2] / stats.nodes_per_depth[1]
+        assert stats.table['stores'] > 0 and stats.nps > 0
+        assert json.loads(json.dumps(stats.as_dict()))['nodes'] == variants
+
+    def test_tracer(self):
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        tracer = CountingTracer()
+        decision = DecisionTree(2, tracer=tracer)
+        move, score, variants = decision.best_move(board)
+        # Positions are entered after a move, razoring searches the same position again without one
+        assert 0 < tracer.entered <= variants and tracer.plies == []
+
+        stream = io.StringIO()
+        board = Board()
+        board.init(PredefinedFENPosition(self.fen))
+        DecisionTree(2, tracer=TreeDumpTracer(stream, max_ply=1)).best_move(board)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert lines[0]['ply'] == 1 and 'move' in lines[0] and lines[1] == {'ply': 1, 'score': lines[1]['score']}
+        # Root moves, some of them searched again after the null window test
+        assert all(line['ply'] == 1 for line in lines)
+        assert len(lines) % 2 == 0 and len(lines) >= 2 * len(list(board.valid_moves(board.current)))
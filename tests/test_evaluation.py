@@ -0,0 +1,59 @@
+from chemate.bitboard import BitBoard
+from chemate.board import Board
+from chemate.core import Player
+from chemate.decision import DecisionTree
+from chemate.evaluation import square_scores, PHASE_WEIGHTS, MAX_PHASE, WHITE_CASTLED, BLACK_CASTLED
+from chemate.positions import InitialPosition, PredefinedFENPosition
+
+
+def recomputed(board):
+    opening = endgame = phase = 0
+    for figure in board.figures:
+        figure_opening, figure_endgame = square_scores(figure, figure.position.index)
+        opening += figure_opening
+        endgame += figure_endgame
+        phase += PHASE_WEIGHTS[figure.char]
+    return opening, endgame, phase
+
+
+class TestEvaluation(object):
+    def test_initial_position(self):
+        board = Board()
+        board.init(InitialPosition())
+        assert (board.opening, board.endgame, board.phase, board.castled) == (0, 0, MAX_PHASE, 0)
+
+    def test_incremental_state(self):
+        for board in (Board(), BitBoard()):
+            board.init(PredefinedFENPosition('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1'))
+            state = (board.opening, board.endgame, board.phase, board.castled)
+            for move in list(board.valid_moves(Player.WHITE)):
+                board.move(move)
+                assert (board.opening, board.endgame, board.phase) == recomputed(board), str(move)
+                for reply in list(board.valid_moves(Player.BLACK)):
+                    board.move(reply)
+                    assert (board.opening, board.endgame, board.phase) == recomputed(board), str(reply)
+                    board.rollback()
+                board.rollback()
+            assert (board.opening, board.endgame, board.phase, board.castled) == state
+
+    def test_castled(self):
+        board = Board()
+        board.init(PredefinedFENPosition('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1'))
+        board.move(next(m for m in board.valid_moves(Player.WHITE) if str(m) == '0-0'))
+        assert board.castled == WHITE_CASTLED
+        board.move(next(m for m in board.valid_moves(Player.BLACK) if str(m) == '0-0-0'))
+        assert board.castled == WHITE_CASTLED | BLACK_CASTLED
+        board.rollback()
+        board.rollback()
+        assert board.castled == 0
+
+    def test_estimate_ignores_game_length(self):
+        board = Board()
+        board.init(InitialPosition())
+        decision = DecisionTree(1)
+        decision.board = board
+        for _ in range(4):
+            for name in ('Ng1-f3', 'ng8-f6', 'Nf3-g1', 'nf6-g8'):
+                board.move(next(m for m in board.valid_moves(board.current) if str(m) == name))
+        assert len(board.moves) == 16
+        assert abs(decision.estimate()) <= 0.5
@@ -1,3 +1,5 @@
+import pickle
+
 from chemate.figures import *
 from chemate.board import Board
 from chemate.positions import EmptyPosition
@@ -23,6 +25,13 @@ class TestFigure(object):
         board1.move(next(board1.figure_moves(p1)))
         assert p1 != p2
 
+    def test_compact_layout(self):
+        pawn = Pawn(Player.WHITE, Position.from_char('e2'))
+        assert pawn.position is Position(12) is Position.from_xy(4, 1)
+        assert Position.from_char('e2') + 8 is Position.from_char('e3')
+        assert pickle.loads(pickle.dumps(pawn.position)) is pawn.position
+        assert not hasattr(pawn, '__dict__')
+
 
 class TestBishop(object):
     def test_move(self):
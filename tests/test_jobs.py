@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from chemate.webapp.api.jobs import AnalysisJob, JobScheduler, QueueFull
+
+KIWIPETE = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+ENDGAME = '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'
+
+
+@pytest.fixture
+def scheduler():
+    # No threads: jobs stay queued
+    scheduler = JobScheduler(concurrency=0, queue_size=2, max_time=5, max_nodes=50000)
+    yield scheduler
+    scheduler.close()
+
+
+class TestJobScheduler(object):
+    def test_coalescing_and_queue_limit(self, scheduler):
+        job = scheduler.submit(KIWIPETE, 3)
+        assert scheduler.submit(KIWIPETE, 3) is job and job.waiters == 2
+        assert (job.depth, job.time_limit, job.node_limit) == (3, 5, 50000)
+        assert scheduler.submit(KIWIPETE, 4, time_limit=60, node_limit=10 ** 6).key == (KIWIPETE, 4, 5, 50000, 0.0, None)
+        with pytest.raises(QueueFull):
+            scheduler.submit(ENDGAME)
+
+        assert scheduler.cancel(job.id).status == AnalysisJob.QUEUED
+        assert scheduler.cancel(job.id).status == AnalysisJob.CANCELLED
+        assert scheduler.get(job.id) is job and job.finished.is_set()
+        assert scheduler.submit(KIWIPETE, 3) is not job
+
+    def test_run_with_budget(self):
+        scheduler = JobScheduler(max_time=5, max_nodes=3000)
+        try:
+            job = scheduler.submit(ENDGAME, 20)
+            assert job.finished.wait(10)
+            assert job.status == AnalysisJob.DONE and job.result['move'] is not None
+            assert job.result['variants'] < 3000 * 2 and job.result['stats']['depth'] >= 1
+            assert scheduler.submit(ENDGAME, 20) is not job
+        finally:
+            scheduler.close()
+
+    def test_cancel_before_search(self):
+        class LateScheduler(JobScheduler):
+            def run(self, job):
+                # The request is withdrawn after the job is taken but before its search starts
+                self.cancel(job.id)
+                return super().run(job)
+
+        scheduler = LateScheduler(max_time=60)
+        try:
+            started = time.time()
+            job = scheduler.submit(KIWIPETE, 20)
+            assert job.finished.wait(10)
+            assert job.status == AnalysisJob.CANCELLED and time.time() - started < 10
+        finally:
+            scheduler.close()
+
+    def test_variety_not_shared(self, scheduler):
+        scheduler.queue_size = 4
+        noisy = scheduler.submit(KIWIPETE, 3, variety=0.5)
+        assert scheduler.submit(KIWIPETE, 3, variety=0.5) is not noisy
+        seeded = scheduler.submit(KIWIPETE, 3, variety=0.5, seed=1)
+        assert scheduler.submit(KIWIPETE, 3, variety=0.5, seed=1) is seeded
+
+    def test_history(self, scheduler):
+        scheduler.history = 1
+        first, second = scheduler.submit(KIWIPETE), scheduler.submit(ENDGAME)
+        scheduler.cancel(first.id)
+        scheduler.cancel(second.id)
+        assert scheduler.get(first.id) is None and scheduler.get(second.id) is second
+
+
+class TestAnalysisApi(object):
+    def test_submit_poll_cancel(self, app, client, scheduler):
+        app.config['ANALYSIS_RETRY_AFTER'] = 7
+        app.extensions['job_scheduler'] = scheduler
+
+        response = client.post('/api/game/analysis', json={'board': KIWIPETE, 'depth': 2})
+        assert response.status_code == 202
+        job = response.get_json()
+        assert job['status'] == 'queued' and job['depth'] == 2
+        assert client.post('/api/game/analysis', json={'board': KIWIPETE, 'depth': 2}).get_json()['id'] == job['id']
+        client.post('/api/game/analysis', json={'board': ENDGAME})
+        response = client.post('/api/game/analysis', json={'board': KIWIPETE})
+        assert response.status_code == 429 and response.headers['Retry-After'] == '7'
+
+        assert client.get(f'/api/game/analysis/{job["id"]}').get_json() == job
+        client.delete(f'/api/game/analysis/{job["id"]}')
+        assert client.delete(f'/api/game/analysis/{job["id"]}').get_json()['status'] == 'cancelled'
+        assert client.get('/api/game/analysis/00000000-0000-0000-0000-000000000000').status_code == 404
+
+    def test_calc_through_scheduler(self, app, client, scheduler):
+        app.config['ANALYSIS_RETRY_AFTER'] = 7
+        app.extensions['job_scheduler'] = scheduler
+        scheduler.queue_size = 0
+        game_id = client.post('/api/game/sessions').get_json()['id']
+        response = client.post('/api/game/calc', json={'board': ENDGAME})
+        assert response.status_code == 429 and response.headers['Retry-After'] == '7'
+        assert client.post(f'/api/game/{game_id}/calc', json={}).status_code == 429
+
+        running = JobScheduler(max_time=5, max_nodes=3000)
+        app.extensions['job_scheduler'] = running
+        try:
+            state = client.post('/api/game/calc', json={'board': ENDGAME, 'time_limit': 60}).get_json()
+            job, = running.jobs.values()
+            assert job.time_limit == 5 and state['move'].startswith(job.result['move']) and state['board'].startswith('8/2p5/')
+            state = client.post(f'/api/game/{game_id}/calc', json={}).get_json()
+            assert state['moves'] == [state['move']] and ' b ' in state['board'] and len(running.jobs) == 2
+            assert client.post('/api/game/calc', json={'board': 'k7/2Q5/1K6/8/8/8/8/8 b - - 0 1'}).status_code == 422
+        finally:
+            running.close()
@@ -0,0 +1,71 @@
+from chemate.board import Board
+from chemate.core import MoveCode, Player
+from chemate.ordering import MoveOrdering
+from chemate.positions import PredefinedFENPosition
+
+
+def board_of(fen):
+    board = Board()
+    board.init(PredefinedFENPosition(fen))
+    return board
+
+
+def code_of(board, name):
+    return next(code for code in board.legal_moves(board.current) if str(board.movement(code)) == name)
+
+
+class TestMoveOrdering:
+    fen = '4k3/8/3q4/2P1r3/4N3/5b2/8/K6Q w - - 0 1'
+
+    def test_captures_by_victim_and_attacker(self):
+        ordering = MoveOrdering()
+        board = board_of(self.fen)
+        moves = ordering.order(board.legal_moves(Player.WHITE), None, 0, Player.WHITE, board.board)
+        assert [str(board.movement(code)) for code in moves[:3]] == ['c5xd6', 'Ne4xd6', 'Qh1xf3']
+
+    def test_hash_move_first(self):
+        ordering = MoveOrdering()
+        board = board_of(self.fen)
+        quiet = code_of(board, 'Ka1-b1')
+        ordered = ordering.order(board.legal_moves(Player.WHITE), quiet & MoveCode.KEY_MASK, 0, Player.WHITE,
+                                 board.board)
+        assert ordered[0] == quiet
+
+    def test_killers_and_history(self):
+        ordering = MoveOrdering()
+        board = board_of(self.fen)
+        moves = board.legal_moves(Player.WHITE)
+        first = code_of(board, 'Ka1-b1')
+        second = code_of(board, 'Ka1-b2')
+        ordering.add_cutoff(first, 3, 1, Player.WHITE)
+        ordering.add_cutoff(second, 1, 1, Player.WHITE)
+        assert ordering.killers[1] == [second, first]
+
+        captures = sum(1 for code in moves if not MoveOrdering.is_quiet(code))
+        ordered = ordering.order(moves, None, 1, Player.WHITE, board.board)
+        assert ordered[captures] == second and ordered[captures + 1] == first
+
+        # Other ply has no killers, quiet moves follow history scores
+        ordered = ordering.order(moves, None, 2, Player.WHITE, board.board)
+        assert ordered[captures] == first and ordered[captures + 1] == second
+
+        ordering.new_search()
+        assert ordering.killers == []
+        assert ordering.history[Player.WHITE][first] == 4
+
+    def test_staged_moves(self):
+        ordering = MoveOrdering()
+        board = board_of(self.fen)
+        killer = code_of(board, 'Ka1-b2')
+        quiet = code_of(board, 'Ka1-b1')
+        ordering.add_cutoff(killer, 1, 0, Player.WHITE)
+        expected = ordering.order(board.legal_moves(Player.WHITE), quiet & MoveCode.KEY_MASK, 0, Player.WHITE,
+                                  board.board)
+
+        staged = list(ordering.staged(board, Player.WHITE, quiet & MoveCode.KEY_MASK, 0, []))
+        assert staged == expected
+        assert staged[0] == quiet and str(board.movement(staged[1])) == 'c5xd6'
+
+        # Hash move from another position is skipped
+        moves = ordering.staged(board, Player.WHITE, 0, 0, [])
+        assert next(moves) == expected[1]
@@ -0,0 +1,39 @@
+from chemate.bitboard import BitBoard
+from chemate.board import Board
+from chemate.core import MoveCode
+from chemate.perft import POSITIONS, create_board, perft, divide, compare, main
+
+
+class NoPassthroughBoard(Board):
+    def legal_moves(self, color, codes=None, captures=None, safety=None):
+        codes = super().legal_moves(color, codes, captures, safety)
+        codes[:] = [code for code in codes if not code & MoveCode.PASSTHROUGH]
+        return codes
+
+
+class TestPerft(object):
+    def test_known_counts(self):
+        for name, (fen, counts) in POSITIONS.items():
+            for kind in (Board, BitBoard):
+                board = create_board(fen, kind)
+                assert perft(board, 2) == counts[1], name
+                assert board.hash == board.compute_hash() and not board.history
+
+    def test_divide_and_hash(self):
+        fen, counts = POSITIONS['passthrough']
+        board = create_board(fen)
+        result = divide(board, 3, {})
+        assert len(result) == counts[0] and sum(result.values()) == counts[2]
+        assert result['e2e4'] == perft(create_board('8/2p5/3p4/KP5r/1R3p1k/8/6P1/8 b - e3 0 1'), 2)
+        assert perft(board, 4, {}) == counts[3]
+
+    def test_compare(self):
+        assert compare(POSITIONS['kiwipete'][0], 2) == []
+        differences = compare(POSITIONS['kiwipete'][0], 2, BitBoard, NoPassthroughBoard)
+        assert differences == [('a2a4', ['b4a3'], [])]
+
+    def test_main(self, capsys):
+        assert main(['initial', '-d', '2', '--divide']) == 0
+        out = capsys.readouterr().out
+        assert 'e2e4: 20' in out and 'nodes 400' in out and out.rstrip().endswith('ok')
+        assert main(['--compare', '-d', '1']) == 0
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from chemate.board import Board
+from chemate.core import Player
+from chemate.decision import DecisionTree
+from chemate.pool import SearchPool, SearchToken, encode_position, decode_position
+from chemate.positions import InitialPosition, PredefinedFENPosition
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with SearchPool(2) as pool:
+        yield pool
+
+
+class TestPositionEncoding(object):
+    def test_round_trip_keeps_history(self):
+        board = Board()
+        board.init(InitialPosition())
+        for name in ('e2-e4', 'e7-e5', 'Ng1-f3', 'nb8-c6'):
+            board.move(next(m for m in board.valid_moves(board.current) if str(m) == name))
+        position = encode_position(board)
+
+        assert len(board.moves) == 4
+        assert position[0].startswith('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w')
+        copy = decode_position(position)
+        assert copy.hash == board.hash
+        assert [str(m) for m in copy.moves] == [str(m) for m in board.moves]
+
+    def test_token(self):
+        token = SearchToken()
+        assert not token.cancelled
+        token.cancel()
+        assert token.cancelled
+
+    def test_token_generation(self):
+        flags = [0]
+        old = SearchToken(flags, 0, 1)
+        flags[0] = 2
+        new = SearchToken(flags, 0, 2)
+        assert old.cancelled and not new.cancelled
+        old.cancel()
+        assert not new.cancelled
+
+
+class TestSearchPool(object):
+    def test_mate_in_one(self, pool):
+        board = Board()
+        board.init(PredefinedFENPosition('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1'))
+        decision = DecisionTree(2, pool=pool)
+        for _ in range(2):
+            move, score, variants = decision.best_move(board)
+            assert str(move) == 'Rd1-d8'
+            assert score == DecisionTree.mate_score - 1
+        assert len(board.moves) == 0
+        assert len(pool.free) == len(pool.flags)
+
+    def test_cancel(self, pool):
+        board = Board()
+        board.init(PredefinedFENPosition('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'))
+        decision = DecisionTree(3, pool=pool)
+        threading.Timer(0.5, decision.cancel).start()
+        started = time.time()
+        move, score, variants = decision.best_move(board, depth=20, time_limit=60)
+        assert time.time() - started < 10
+        assert decision.depth_reached < 20
+        assert board.current == Player.WHITE and len(board.moves) == 0
+
+    def test_root_scores_as_full_window(self, pool, exact_decision_tree):
+        # Moves tested by workers against an older alpha are tested again when alpha has grown since
+        board = Board()
+        board.init(PredefinedFENPosition('2b1kb1r/r2pp2p/p1n3p1/Ppp2p2/1PP3n1/1Q6/R2PBPPP/1NB1K1NR b K-k- - 0 17'))
+        move, score, variants = exact_decision_tree(pool).best_move(board, depth=3)
+
+        decision = exact_decision_tree()
+        decision.board = board
+        best = max(decision.search_move(code, 3, -decision.infinity, decision.infinity, 0)
+                   for code in board.legal_moves(board.current))
+        assert board.current * score == best
+
+    def test_variety_keeps_table_exact(self, pool):
+        # Noisy scores stored by a search with variety are not read by later deterministic searches
+        fen = '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'
+        results = []
+        for variety, search_pool in ((5.0, pool), (0.0, pool), (0.0, None)):
+            board = Board()
+            board.init(PredefinedFENPosition(fen))
+            move, score, variants = DecisionTree(3, pool=search_pool, variety=variety, seed=1).best_move(board)
+            results.append(score)
+        assert results[1] == results[2] != results[0]
+
+    def test_reused_slot_keeps_tasks_cancelled(self, pool):
+        board = Board()
+        board.init(PredefinedFENPosition('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'))
+        position, options = encode_position(board), DecisionTree(3).search_options()
+        moves = board.legal_moves(board.current)
+        token = pool.acquire()
+        stale = pool.search_moves(token, position, options, moves, 4, -DecisionTree.infinity,
+                                  DecisionTree.infinity, None, None)
+        token.cancel()
+        pool.release(token)
+
+        # The next search gets the same slot, its tasks don't wait for the cancelled ones to finish
+        token = pool.acquire()
+        try:
+            results = list(pool.search_moves(token, position, options, moves[:1], 1, -DecisionTree.infinity,
+                                             DecisionTree.infinity, None, None))
+            assert results[0][0] is not None
+            assert all(score is None for score, counters, table_stats in stale)
+        finally:
+            pool.release(token)
+
+    def test_lazy_smp(self, pool):
+        board = Board()
+        board.init(PredefinedFENPosition('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1'))
+        decision = DecisionTree(3, pool=pool, lazy_smp=True)
+        move, score, variants = decision.best_move(board)
+        assert str(move) == 'Rd1-d8'
+        assert score == DecisionTree.mate_score - 1
+        assert decision.table.stores > 0
+        assert len(pool.free) == len(pool.flags)
+
+    def test_worker_counters(self, pool):
+        board = Board()
+        board.init(PredefinedFENPosition('r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 2 3'))
+        decision = DecisionTree(3, pool=pool)
+        move, score, variants = decision.best_move(board)
+        assert decision.stats.nodes == variants and decision.stats.cutoffs > 0
+        assert decision.stats.quiescence_nodes > 0 and decision.stats.table['stores'] > 0
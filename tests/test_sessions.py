@@ -0,0 +1,79 @@
+import uuid
+
+from chemate.board import Board
+from chemate.positions import InitialPosition
+from chemate.webapp.api.sessions import SessionStore
+
+
+class FakeClock(object):
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def new_board() -> Board:
+    board = Board()
+    board.init(InitialPosition())
+    return board
+
+
+class TestSessionStore(object):
+    def test_least_recently_used_evicted(self):
+        store = SessionStore(capacity=2, clock=FakeClock())
+        first, second = store.create(new_board()), store.create(new_board())
+        assert store.get(first.id) is first
+        third = store.create(new_board())
+        assert len(store) == 2
+        assert store.get(second.id) is None
+        assert store.get(first.id) is first and store.get(third.id) is third
+
+    def test_idle_timeout(self):
+        clock = FakeClock()
+        store = SessionStore(timeout=10, clock=clock)
+        first = store.create(new_board())
+        clock.now = 6
+        second = store.create(new_board())
+        clock.now = 12
+        assert store.get(first.id) is None
+        assert store.get(second.id) is second
+        clock.now = 30
+        assert store.get(second.id) is None and len(store) == 0
+        assert not store.remove(second.id)
+
+
+class TestSessionApi(object):
+    def test_moves_applied_to_live_board(self, client):
+        state = client.post('/api/game/sessions').get_json()
+        game_id = state['id']
+        assert state['moves'] == [] and len(state['valid_moves']) == 20
+
+        state = client.post(f'/api/game/{game_id}/move', json={'move': ['e2', 'e4']}).get_json()
+        assert state['moves'] == ['e2-e4']
+        assert state['board'].startswith('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b')
+        state = client.post(f'/api/game/{game_id}/move', json={'move': ['e7', 'e5']}).get_json()
+        assert client.get(f'/api/game/{game_id}').get_json() == state
+
+        response = client.post(f'/api/game/{game_id}/move', json={'move': ['e4', 'e6']})
+        assert response.status_code == 422
+        state = client.post(f'/api/game/{game_id}/rollback').get_json()
+        assert state['moves'] == ['e2-e4'] and ' b ' in state['board']
+
+        assert client.delete(f'/api/game/{game_id}').status_code == 204
+        assert client.get(f'/api/game/{game_id}').status_code == 404
+        assert client.post(f'/api/game/{uuid.uuid4()}/move', json={'move': ['e2', 'e4']}).status_code == 404
+
+    def test_promotion_from_fen(self, client):
+        state = client.post('/api/game/sessions', json={'board': '8/P6k/8/8/8/8/8/K7 w - - 0 1'}).get_json()
+        state = client.post(f'/api/game/{state["id"]}/move', json={'move': ['a7', 'a8', 'n']}).get_json()
+        assert state['board'].startswith('N7/7k/')
+
+    def test_search_options_validated(self, client):
+        game_id = client.post('/api/game/sessions').get_json()['id']
+        fen = '8/P6k/8/8/8/8/8/K7 w - - 0 1'
+        for options in ({'variety': 'x'}, {'seed': 'y'}, {'time_limit': -1}, {'variety': -1.0}):
+            assert client.post(f'/api/game/{game_id}/calc', json=options).status_code == 422
+            assert client.post('/api/game/calc', json=dict(options, board=fen)).status_code == 422
+        assert client.post('/api/game/calc', json={}).status_code == 422
+        assert client.get(f'/api/game/{game_id}').get_json()['moves'] == []
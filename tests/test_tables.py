@@ -0,0 +1,39 @@
+import chemate.directions
+from chemate.core import Position, Player
+from chemate.figures import Knight, King, Pawn
+from chemate.tables import RAYS, UP, DOWN, LEFT, RIGHT, UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT, \
+    KNIGHT_MASKS, ROOK_RAY_MASKS
+
+
+class TestTables:
+    def test_rays_match_directions(self):
+        directions = {UP: chemate.directions.Up, DOWN: chemate.directions.Down,
+                      LEFT: chemate.directions.Left, RIGHT: chemate.directions.Right,
+                      UP_LEFT: chemate.directions.UpLeft, UP_RIGHT: chemate.directions.UpRight,
+                      DOWN_LEFT: chemate.directions.DownLeft, DOWN_RIGHT: chemate.directions.DownRight}
+        for direction, kind in directions.items():
+            for index in range(64):
+                expected = list(map(str, kind(Position(index))))
+                assert list(map(str, RAYS[direction][index])) == expected
+
+    def test_rays_are_interned(self):
+        assert RAYS[UP][0][0] is RAYS[LEFT][9][0]
+
+    def test_figure_directions(self):
+        knight = Knight(Player.WHITE, Position.from_char('a1'))
+        assert sorted(str(pos) for ray in knight.directions() for pos in ray) == ['b3', 'c2']
+        assert KNIGHT_MASKS[0] == (1 << Position.from_char('b3').index) | (1 << Position.from_char('c2').index)
+
+        king = King(Player.WHITE, Position.from_char('e1'))
+        assert sorted(str(pos) for ray in king.directions() for pos in ray) == \
+               ['c1', 'd1', 'd2', 'e2', 'f1', 'f2', 'g1']
+        assert sorted(str(pos) for ray in king.directions(True) for pos in ray) == ['d1', 'd2', 'e2', 'f1', 'f2']
+
+        pawn = Pawn(Player.BLACK, Position.from_char('e7'))
+        assert [list(map(str, ray)) for ray in pawn.directions()] == [['f6'], ['d6'], ['e6', 'e5']]
+        assert [list(map(str, ray)) for ray in pawn.directions(True)] == [['f6'], ['d6']]
+
+    def test_ray_masks(self):
+        positive, masks = ROOK_RAY_MASKS[0]
+        assert positive
+        assert masks[Position.from_char('a7').index] == 1 << Position.from_char('a8').index
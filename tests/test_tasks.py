@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from chemate.webapp.api.tasks import TaskStore
+
+TASKS = [
+    {'response': {'fen': '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'theme': 'mate', 'difficulty': 1,
+                  'solution': ['a1a8']}},
+    {'response': {'fen': '8/P6k/8/8/8/8/8/K7 w - - 0 1', 'theme': 'promotion', 'difficulty': 1}},
+    {'response': {'fen': 'k7/8/1K6/8/8/8/8/7R w - - 0 1', 'theme': 'mate', 'difficulty': 2,
+                  'solution': ['h1h8']}},
+]
+
+
+@pytest.fixture
+def tasks_file(app, tmp_path):
+    path = tmp_path / 'tasks.json'
+    path.write_text(json.dumps(TASKS))
+    app.config['TASKS_FILE'] = str(path)
+    return path
+
+
+class TestTaskStore(object):
+    def test_index(self):
+        described = []
+        store = TaskStore(TASKS, lambda fen: described.append(fen) or {'board': fen})
+        assert len(store) == 3 and described == [task['response']['fen'] for task in TASKS]
+        assert {store.choice('mate').id for _ in range(50)} == {0, 2}
+        assert store.choice('mate', '2').id == 2
+        assert store.choice(difficulty='1').theme in ('mate', 'promotion')
+        assert store.choice('promotion', '2') is None
+        assert store.get(1).solution == [] and store.get(3) is None
+        assert store.get(0).as_dict() == {'board': TASKS[0]['response']['fen'],
+                                          'task': {'id': 0, 'theme': 'mate', 'difficulty': '1',
+                                                   'solution': ['a1a8']}}
+
+    def test_missing_file(self, tmp_path):
+        assert len(TaskStore.load(str(tmp_path / 'missing.json'), dict)) == 0
+
+
+class TestTasksApi(object):
+    def test_selection(self, client, tasks_file):
+        state = client.get('/api/game/tasks', query_string={'theme': 'promotion'}).get_json()
+        assert state['task']['id'] == 1 and len(state['valid_moves']) == 7
+        state = client.get('/api/game/tasks/2').get_json()
+        assert state['board'].startswith('k7/8/1K6/') and state['task']['solution'] == ['h1h8']
+        assert client.get('/api/game/tasks', query_string={'theme': 'fork'}).status_code == 404
+        assert client.get('/api/game/tasks/5').status_code == 404
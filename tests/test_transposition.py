@@ -0,0 +1,91 @@
+import pickle
+
+from chemate.board import Board
+from chemate.decision import DecisionTree
+from chemate.positions import InitialPosition
+from chemate.transposition import TranspositionTable, SharedTranspositionTable, Bound
+
+
+class TestTranspositionTable:
+    def test_store_and_probe(self):
+        table = TranspositionTable(memory=1024 * 1024)
+        assert table.buckets == 1024 * 1024 // (2 * TranspositionTable.entry_size)
+        assert table.probe(12345) is None
+        table.store(12345, 3, 1.5, Bound.EXACT, 100)
+        assert table.probe(12345)[:5] == (12345, 3, 1.5, Bound.EXACT, 100)
+        assert table.hits == 1 and table.misses == 1 and table.stores == 1
+        assert table.hit_rate == 0.5
+
+    def test_replacement(self):
+        table = TranspositionTable(memory=2 * TranspositionTable.entry_size)
+        assert table.buckets == 1
+        table.store(1, 5, 0, Bound.EXACT, None)
+        # Shallower entry goes to the always-replace slot and keeps the deep one
+        table.store(2, 1, 0, Bound.EXACT, None)
+        assert table.probe(1) is not None and table.probe(2) is not None
+        table.store(3, 1, 0, Bound.EXACT, None)
+        assert table.probe(1) is not None and table.probe(2) is None and table.probe(3) is not None
+        # Deeper entry takes the depth-preferred slot
+        table.store(4, 6, 0, Bound.LOWER, None)
+        assert table.probe(1) is None and table.probe(4) is not None
+        assert table.overwrites == 2
+
+    def test_old_entries_are_replaced(self):
+        table = TranspositionTable(memory=2 * TranspositionTable.entry_size)
+        table.store(1, 5, 0, Bound.EXACT, None)
+        table.new_search()
+        table.store(2, 1, 0, Bound.EXACT, None)
+        assert table.slots[0][0] == 2
+
+    def test_search_uses_table(self):
+        board = Board()
+        board.init(InitialPosition())
+        decision = DecisionTree(3, table_memory=1024 * 1024)
+        decision.board = board
+        decision.negamax(3, -decision.infinity, decision.infinity, 0)
+        first_variants = decision.variants
+        assert decision.table.stores > 0
+        decision.table.reset_stats()
+        decision.variants = 0
+        decision.negamax(3, -decision.infinity, decision.infinity, 0)
+        assert decision.table.hits > 0
+        assert decision.variants < first_variants
+
+
+class TestSharedTranspositionTable:
+    def test_store_and_probe(self):
+        table = SharedTranspositionTable(memory=1024 * 1024)
+        try:
+            assert table.probe(12345) is None
+            table.store(12345, 3, 1.5, Bound.EXACT, 100)
+            table.store(2 ** 64 - 1, 2, -9998, Bound.LOWER, None)
+            assert table.probe(12345)[:5] == (12345, 3, 1.5, Bound.EXACT, 100)
+            assert table.probe(2 ** 64 - 1)[:5] == (2 ** 64 - 1, 2, -9998, Bound.LOWER, None)
+            table.clear()
+            assert table.probe(12345) is None
+        finally:
+            table.close()
+
+    def test_shared_between_copies(self):
+        table = SharedTranspositionTable(memory=1024 * 1024)
+        try:
+            copy = pickle.loads(pickle.dumps(table))
+            view = table.view()
+            copy.store(7, 4, 0.25, Bound.UPPER, 42)
+            copy.new_search()
+            assert view.probe(7)[:5] == (7, 4, 0.25, Bound.UPPER, 42)
+            assert table.generation == 1
+            assert view.hits == 1 and table.hits == 0
+            copy.close()
+        finally:
+            table.close()
+
+    def test_torn_entry_is_ignored(self):
+        table = SharedTranspositionTable(memory=2 * SharedTranspositionTable.entry_size)
+        try:
+            table.store(1, 5, 0.5, Bound.EXACT, None)
+            # Another process has written only the score word of its entry
+            table.words[3] ^= 1
+            assert table.probe(1) is None
+        finally:
+            table.close()
@@ -0,0 +1,69 @@
+from chemate.bitboard import BitBoard
+from chemate.board import Board
+from chemate.core import Player
+from chemate.positions import InitialPosition, PredefinedFENPosition
+from chemate.utils import FENExporter
+
+
+def play(board, *moves):
+    for name in moves:
+        board.move(next(m for m in board.valid_moves(board.current) if str(m).rstrip('+') == name))
+
+
+class TestZobrist:
+    def test_incremental_matches_scratch(self):
+        for kind in (Board, BitBoard):
+            board = kind()
+            board.init(PredefinedFENPosition('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'))
+            initial = board.hash
+            for move in list(board.valid_moves(Player.WHITE)):
+                board.move(move)
+                assert board.hash == board.compute_hash(), str(move)
+                for reply in list(board.valid_moves(Player.BLACK)):
+                    board.move(reply)
+                    assert board.hash == board.compute_hash(), f'{move} {reply}'
+                    board.rollback()
+                board.rollback()
+            assert board.hash == initial
+
+    def test_transposition(self):
+        first, second = Board(), Board()
+        first.init(InitialPosition())
+        second.init(InitialPosition())
+        play(first, 'Ng1-f3', 'ng8-f6', 'Nb1-c3')
+        play(second, 'Nb1-c3', 'ng8-f6', 'Ng1-f3')
+        assert first.hash == second.hash
+
+        play(first, 'nf6-g8', 'Nf3-g1', 'ng8-f6', 'Ng1-f3')
+        assert first.hash == second.hash, "Repeated position must have the same key"
+
+        first.init(PredefinedFENPosition('4k3/8/8/8/8/8/8/4K3 w - - 0 1'))
+        second.init(PredefinedFENPosition('4k3/8/8/8/8/8/8/4K3 b - - 0 1'))
+        assert first.hash != second.hash, "Side to move must be a part of the key"
+
+    def test_rooking_and_passthrough(self):
+        board = Board()
+        board.init(PredefinedFENPosition('4k2r/8/8/8/8/8/4P3/4K2R w Kk - 0 1'))
+        rights = board.hash
+        board.init(PredefinedFENPosition('4k2r/8/8/8/8/8/4P3/4K2R w k - 0 1'))
+        assert board.hash != rights
+
+        board.init(PredefinedFENPosition('4k2r/8/8/8/8/8/4P3/4K2R w Kk - 0 1'))
+        play(board, 'e2-e4')
+        assert str(board.passthrough_square()) == 'e3'
+        fen = board.export(FENExporter)
+        assert ' e3 ' in fen
+
+        restored = Board()
+        restored.init(PredefinedFENPosition(fen))
+        assert restored.hash == board.hash
+        assert str(restored.passthrough_square()) == 'e3'
+
+    def test_rooking_lost_by_move(self):
+        board = Board()
+        board.init(PredefinedFENPosition('4k2r/8/8/8/8/8/8/4K2R w Kk - 0 1'))
+        play(board, 'Rh1-h2', 'ke8-e7', 'Rh2-h1', 'ke7-e8')
+        restored = Board()
+        restored.init(PredefinedFENPosition('4k2r/8/8/8/8/8/8/4K2R w - - 0 3'))
+        assert board.rooking == 0
+        assert board.hash == restored.hash